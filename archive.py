@@ -0,0 +1,129 @@
+from datetime import date, datetime, timedelta
+import os
+import threading
+
+from todo import ToDo
+from todolist import ToDoList
+
+
+def archive_path(filename: str) -> str:
+    """The archive lives next to the list: `todos.yaml` -> `todos.yaml.archive.yaml`."""
+    return filename.rstrip("/\\") + ".archive.yaml"
+
+
+class Archive:
+    """Completed tasks moved out of the working list.
+
+    The file is append-only: every archiving run adds one YAML document
+    with the archived tasks, restoring a task adds a document listing its
+    id. The file is only read when something asks for its tasks.
+    """
+
+    filename: str
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._tasks = None # task id -> task, once loaded
+        self._stats = None # (year, month) -> {day ordinal: (task count, done count)}
+
+    def exists(self) -> bool:
+        return os.path.exists(self.filename)
+
+    def _append(self, document: dict):
+        import yaml
+        from yaml_io import YamlDumper, YAML_DUMP_OPTIONS
+        with open(self.filename, "a", encoding="utf-8") as f:
+            yaml.dump(document, f, Dumper=YamlDumper, explicit_start=True, **YAML_DUMP_OPTIONS)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _load(self):
+        if self._tasks is not None:
+            return
+        tasks = {}
+        if self.exists():
+            import yaml
+            from yaml_io import YamlLoader
+            with open(self.filename, "r", encoding="utf-8") as f:
+                for document in yaml.load_all(f, Loader=YamlLoader):
+                    if not document:
+                        continue
+                    for key, task_dict in (document.get("tasks") or {}).items():
+                        task = ToDo.From_dict(key, task_dict)
+                        tasks[task.id] = task
+                    for task_id in document.get("restored") or []:
+                        tasks.pop(task_id, None)
+        self._tasks = tasks
+
+    def add(self, tasks: list[ToDo]):
+        if len(tasks) <= 0:
+            return
+        document = {
+            "archived": datetime.now(),
+            "tasks": {task.id: task.to_dict() for task in tasks},
+        }
+        with self._lock:
+            self._append(document)
+            if self._tasks is not None:
+                for task in tasks:
+                    self._tasks[task.id] = task
+            self._stats = None
+
+    def restore(self, tasks: list[ToDo]):
+        """Drop tasks from the archive; the caller adds them back to the list."""
+        if len(tasks) <= 0:
+            return
+        with self._lock:
+            self._append({"restored_at": datetime.now(), "restored": [task.id for task in tasks]})
+            self._load()
+            for task in tasks:
+                self._tasks.pop(task.id, None)
+            self._stats = None
+
+    def tasks(self) -> list[ToDo]:
+        """All archived tasks, most recently completed first."""
+        with self._lock:
+            self._load()
+            tasks = list(self._tasks.values())
+        tasks.sort(key=lambda task: task.done_since() or datetime.min, reverse=True)
+        return tasks
+
+    def month_stats(self, year: int, month: int) -> dict[int, tuple[int, int]]:
+        """Like ToDoList.month_stats, for the archived tasks."""
+        with self._lock:
+            if self._stats is None:
+                self._load()
+                stats = {}
+                for task in self._tasks.values():
+                    day = task.planned_day()
+                    if day is None:
+                        continue
+                    d = date.fromordinal(day)
+                    days = stats.setdefault((d.year, d.month), {})
+                    count, done = days.get(day, (0, 0))
+                    days[day] = (count + 1, done + (1 if task.state else 0))
+                self._stats = stats
+            return self._stats.get((year, month), {})
+
+
+def archive_done_tasks(todo_list: ToDoList, archive: Archive, older_than: timedelta) -> int:
+    """Move tasks that were completed longer than older_than ago into the archive.
+
+    Only the tasks in memory are looked at, so this is one pass over the
+    working set. Done tasks without a recorded completion time (from files
+    older than completion times) are never archived. The archive is written (and synced) before the tasks are
+    removed; the caller saves the list. Returns the number of archived tasks.
+    """
+    cutoff = datetime.now() - older_than
+    with todo_list.lock:
+        tasks = []
+        for task in todo_list.tasks:
+            done = task.completed_at if task.state else None
+            if done is not None and done.replace(tzinfo=None) < cutoff:
+                tasks.append(task)
+    if len(tasks) <= 0:
+        return 0
+    archive.add(tasks)
+    todo_list.remove_tasks(tasks)
+    return len(tasks)
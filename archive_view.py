@@ -0,0 +1,131 @@
+from datetime import datetime
+
+from consts import *
+from tools import *
+from todo import ToDo
+from todolist import ToDoList
+from archive import Archive
+from screen import Frame
+from list_view import ListView, page_down, page_up
+
+
+class ArchiveView:
+
+    todos: ToDoList
+    archive: Archive
+    restored: int
+
+    def __init__(self, todos: ToDoList, archive: Archive):
+        self.todos = todos
+        self.archive = archive
+        self.restored = 0
+        self._selected = 0
+        self._tasks = archive.tasks()
+
+    def display(self):
+        larr = style(2)
+        rarr = style(3)
+        max_index = max(len(self._tasks) - 1, 0)
+        inner_w = HL_SIZE - 10
+        with Frame():
+            cls()
+            hl()
+            center("ARCHIVE:", color=COLOR_BOLD + COLOR_BRIGHT_MAGENTA + COLOR_UNDERLINE)
+            hl()
+            if len(self._tasks) <= 0:
+                center("The archive is empty.", color=COLOR_BRIGHT_BLACK)
+            view = ListView(self._tasks, 0, MENU_PAGE_SIZE * 2)
+            for i, task in view.visible(self._selected):
+                selected = i == self._selected
+                prefix = (" " + larr + larr + larr + " ") if selected else "     "
+                suffix = (" " + rarr + rarr + rarr + " ") if selected else "     "
+                color = COLOR_BRIGHT_YELLOW if selected else None
+                task.print_min(prefix, suffix, inner_w, HL_SIZE, color=color, index=i, max_index=max_index)
+            hl()
+            center(f"{len(self._tasks)} archived tasks", color=COLOR_CYAN)
+            center("Options: b p n < > d r ?", color=COLOR_BRIGHT_CYAN)
+            hl()
+
+    def _print_help(self):
+        cls()
+        hl()
+        center("Archive Help", color=COLOR_BRIGHT_MAGENTA)
+        hl()
+        print("   q")
+        print("   b")
+        print("  ^X           Back to the main menu")
+        print("")
+        print("  p / n        Select the previous / next task")
+        print("")
+        print("  < / >        Move one page up / down")
+        print("")
+        print("  d [N]        Show the details of the selected task (or of task N)")
+        print("")
+        print("  r [N]        Restore the selected task (or task N) to the ToDo list")
+        print("")
+        print("  ?            Show this help message")
+        hl()
+        input(" Press Enter to continue...")
+
+    def _task_for(self, cmd: str) -> ToDo|None:
+        arg = cmd[1:].strip()
+        if arg.isnumeric():
+            index = int(arg)
+        else:
+            index = self._selected
+        if index < 0 or index >= len(self._tasks):
+            return None
+        return self._tasks[index]
+
+    def _restore(self, task: ToDo):
+        self.archive.restore([task])
+        if task.state:
+            # otherwise the next start archives it again right away
+            task.completed_at = datetime.now()
+        self.todos.add_task(task)
+        self._tasks.remove(task)
+        self._selected = min(self._selected, max(len(self._tasks) - 1, 0))
+        self.restored += 1
+
+    def _handle_input(self) -> bool:
+        cmd = input(": ").strip().lower()
+        if len(cmd) <= 0:
+            return True
+        cmds = cmd[0]
+        total = len(self._tasks)
+        if cmd == "b" or cmd == "q" or cmd == CTRL_X_INPUT:
+            return False
+
+        elif cmds == "d":
+            task = self._task_for(cmd)
+            if task is not None:
+                cls()
+                task.print_full()
+                input("Press Enter to return to the archive...")
+
+        elif cmds == "r":
+            task = self._task_for(cmd)
+            if task is not None:
+                self._restore(task)
+
+        elif cmd == "?":
+            self._print_help()
+
+        elif total > 0:
+            for c in cmd:
+                if c == "n":
+                    self._selected = (self._selected + 1) % total
+                elif c == "p":
+                    self._selected = (self._selected - 1) % total
+                elif c == ">":
+                    self._selected = page_down(self._selected, total, MENU_PAGE_SIZE * 2)
+                elif c == "<":
+                    self._selected = page_up(self._selected, total, MENU_PAGE_SIZE * 2)
+
+        return True
+
+    def run(self):
+        while True:
+            self.display()
+            if not self._handle_input():
+                break
@@ -0,0 +1,101 @@
+import os
+import sys
+import threading
+
+try:
+    import readline
+except ImportError:
+    readline = None
+
+
+async def run_blocking(fn, *args):
+    """Run fn(*args) on a daemon thread and wait for it without blocking the event loop.
+
+    Unlike asyncio.to_thread the thread does not keep the interpreter
+    alive, so quitting never waits for a pending input() to return.
+    """
+    import asyncio
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def deliver(value, error):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(value)
+
+    def work():
+        try:
+            value, error = fn(*args), None
+        except BaseException as e:
+            value, error = None, e
+        try:
+            loop.call_soon_threadsafe(deliver, value, error)
+        except RuntimeError:
+            pass # the loop is already closed
+
+    threading.Thread(target=work, name="todos-blocking", daemon=True).start()
+    return await future
+
+
+class PipedStdin:
+    """Stands in for sys.stdin when it is not a terminal.
+
+    input() then reads through readline() here, which uses os.read and
+    holds no lock of the io module. A daemon thread left waiting in a read
+    of the real, buffered sys.stdin makes the interpreter abort with a
+    fatal error if it exits meanwhile (e.g. on Ctrl-C).
+    """
+
+    encoding: str
+    errors: str
+
+    def __init__(self, stream):
+        self.encoding = stream.encoding
+        self.errors = stream.errors
+        self._fd = stream.fileno()
+        self._buffer = b""
+        self._lock = threading.Lock()
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def isatty(self) -> bool:
+        return False
+
+    def readline(self) -> str:
+        with self._lock:
+            while b"\n" not in self._buffer:
+                chunk = os.read(self._fd, 65536)
+                if not chunk:
+                    break
+                self._buffer += chunk
+            end = self._buffer.find(b"\n") + 1 or len(self._buffer)
+            line = self._buffer[:end]
+            self._buffer = self._buffer[end:]
+        if line.endswith(b"\r\n"):
+            line = line[:-2] + b"\n"
+        return line.decode(self.encoding, self.errors)
+
+    def __iter__(self):
+        return iter(self.readline, "")
+
+
+def use_piped_stdin():
+    """Read piped input with PipedStdin. Terminal input keeps the real sys.stdin (and readline)."""
+    if sys.stdin is not None and not isinstance(sys.stdin, PipedStdin) and not sys.stdin.isatty():
+        sys.stdin = PipedStdin(sys.stdin)
+
+
+async def ainput(prompt: str = "") -> str:
+    """input() that lets timers and background tasks run while the prompt waits."""
+    return await run_blocking(input, prompt)
+
+
+def reprint_prompt(prompt: str):
+    """Show the prompt again after a redraw, with what has been typed so far if readline knows it."""
+    typed = readline.get_line_buffer() if readline is not None else ""
+    sys.stdout.write(prompt + typed)
+    sys.stdout.flush()
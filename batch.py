@@ -0,0 +1,160 @@
+from datetime import datetime
+import shlex
+import sys
+
+
+from todo import ToDo
+from todolist import ToDoList
+from journal import encode_record
+
+
+BATCH_COMMANDS = ("add", "toggle", "done", "undone", "delete", "query", "find", "get")
+
+
+class BatchError(Exception):
+    pass
+
+
+def _parse_date(value: str) -> datetime:
+    if value.lower() == "today":
+        return datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise BatchError(f"Invalid date: {value}")
+
+
+def task_record(task: ToDo) -> dict:
+    return {
+        "id": task.id,
+        "title": task.title,
+        "state": task.state,
+        "created": task.created_at,
+        "planned": task.planned_at,
+        "details": task.description,
+    }
+
+
+class BatchRunner:
+    """Applies text commands to one ToDoList without the interactive UI.
+
+    Every command produces one JSON result line. The list is saved once,
+    after the last command, and only if something changed.
+
+    Commands:
+      add TITLE [YYYY-MM-DD|today] [DETAILS]
+      toggle|done|undone|delete|get TASK   (TASK is an id or an exact title)
+      query [YYYY-MM-DD|today|upcoming|all]
+      find TEXT
+    """
+
+    todo_list: ToDoList
+    filename: str
+    errors: int
+
+    def __init__(self, filename: str, todo_list: ToDoList|None = None):
+        self.filename = filename
+        if todo_list is None:
+            todo_list = ToDoList()
+            todo_list.load(filename)
+            # commands may address any task, not just the ones in the working window
+            todo_list.load_all()
+        self.todo_list = todo_list
+        self.errors = 0
+
+    def _resolve(self, key: str) -> ToDo:
+        task = self.todo_list.get_task(key)
+        if task is not None:
+            return task
+        lowered = key.lower()
+        matches = [task for task in self.todo_list.find_task(key) if task.title.lower() == lowered]
+        if len(matches) <= 0:
+            raise BatchError(f"No task found: {key}")
+        if len(matches) > 1:
+            raise BatchError(f"Ambiguous task title: {key} ({len(matches)} matches)")
+        return matches[0]
+
+    def _add(self, args: list[str]) -> dict:
+        if len(args) <= 0 or len(args) > 3:
+            raise BatchError("Usage: add TITLE [DATE] [DETAILS]")
+        planned = _parse_date(args[1]) if len(args) > 1 and args[1] else None
+        details = args[2] if len(args) > 2 else ""
+        task = ToDo(args[0], details, planned)
+        self.todo_list.add_task(task)
+        return {"task": task_record(task)}
+
+    def _task_command(self, cmd: str, args: list[str]) -> dict:
+        if len(args) != 1:
+            raise BatchError(f"Usage: {cmd} TASK")
+        task = self._resolve(args[0])
+        if cmd == "delete":
+            self.todo_list.remove_task(task)
+        elif cmd == "toggle":
+            task.toggle()
+        elif cmd == "done" and not task.state:
+            task.state = True
+        elif cmd == "undone" and task.state:
+            task.state = False
+        return {"task": task_record(task)}
+
+    def _query(self, args: list[str]) -> dict:
+        if len(args) > 1:
+            raise BatchError("Usage: query [DATE|today|upcoming|all]")
+        what = args[0].lower() if len(args) > 0 else "today"
+        if what == "all":
+            tasks = list(self.todo_list.tasks)
+        elif what == "today":
+            tasks = self.todo_list.get_todays_tasks()
+        elif what == "upcoming":
+            tasks = self.todo_list.get_upcoming_tasks()
+        else:
+            tasks = self.todo_list.get_tasks_for_date(_parse_date(what))
+        return {"tasks": [task_record(task) for task in tasks]}
+
+    def _find(self, args: list[str]) -> dict:
+        if len(args) != 1:
+            raise BatchError("Usage: find TEXT")
+        return {"tasks": [task_record(task) for task in self.todo_list.find_task(args[0])]}
+
+    def execute(self, line: str) -> dict|None:
+        """Run one command line and return its result, or None for blank lines and comments."""
+        try:
+            args = shlex.split(line, comments=True)
+        except ValueError as e:
+            self.errors += 1
+            return {"ok": False, "cmd": line.strip(), "error": str(e)}
+        if len(args) <= 0:
+            return None
+        cmd = args[0].lower()
+        result = {"ok": True, "cmd": cmd}
+        try:
+            if cmd == "add":
+                result.update(self._add(args[1:]))
+            elif cmd in ("toggle", "done", "undone", "delete", "get"):
+                result.update(self._task_command(cmd, args[1:]))
+            elif cmd == "query":
+                result.update(self._query(args[1:]))
+            elif cmd == "find":
+                result.update(self._find(args[1:]))
+            else:
+                raise BatchError(f"Unknown command: {cmd} (expected one of {', '.join(BATCH_COMMANDS)})")
+        except BatchError as e:
+            self.errors += 1
+            return {"ok": False, "cmd": cmd, "error": str(e)}
+        return result
+
+    def run(self, lines, out=None) -> int:
+        """Execute all lines, writing one NDJSON result per command. Returns the exit code."""
+        if out is None:
+            out = sys.stdout
+        revision = self.todo_list.revision
+        for line in lines:
+            result = self.execute(line)
+            if result is not None:
+                out.write(encode_record(result) + "\n")
+        if self.todo_list.revision != revision:
+            self.todo_list.save(self.filename)
+            if self.todo_list.journaled:
+                self.todo_list.compact(self.filename)
+        out.flush()
+        return 1 if self.errors > 0 else 0
@@ -0,0 +1,61 @@
+"""Measure the resident size of one task, comparing the original plain class with ToDo.
+
+Usage: python benchmarks/bench_memory.py [TASK_COUNT]
+"""
+from datetime import datetime, timedelta
+import gc
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from todo import ToDo
+
+
+class PlainToDo():
+    """The task layout before ToDo used __slots__: a __dict__ and two datetimes."""
+
+    def __init__(self, title, description, planned_at):
+        self.state = False
+        self.title = title
+        self.description = description
+        self.created_at = datetime.now()
+        self.planned_at = planned_at
+
+
+def task_specs(count: int, seed: int = 7):
+    rnd = random.Random(seed)
+    recurring = ["Daily standup", "Water the plants", "Weekly review", "Pay rent", "Backup"]
+    for n in range(count):
+        name = rnd.choice(recurring) if rnd.random() < 0.5 else f"Task number {n}"
+        offset = rnd.randint(0, 730) if rnd.random() < 0.7 else None
+        yield name, offset
+
+
+def measure(factory, count: int) -> float:
+    specs = list(task_specs(count))
+    start = datetime(2025, 1, 1)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tasks = []
+    for name, offset in specs:
+        # build fresh strings and dates, the way a loader does
+        title = "".join([name, ""]) if len(name) > 0 else name
+        planned = start + timedelta(days=offset) if offset is not None else None
+        tasks.append(factory(title, "", planned))
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(tasks)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    plain = measure(PlainToDo, count)
+    slotted = measure(ToDo, count)
+    print(f"{count} tasks")
+    print(f"  plain class : {plain:7.1f} bytes/task")
+    print(f"  ToDo        : {slotted:7.1f} bytes/task ({slotted / plain * 100:.0f}% of the plain class)")
@@ -0,0 +1,120 @@
+"""Measure how long the app takes to start and write the results as JSON.
+
+Two numbers are reported:
+- import time: `python -X importtime` for the modules the main menu needs,
+  with the slowest modules by their own import time.
+- time to first frame: main.py is started on a generated list with piped
+  stdin and timed until the options line of the main menu is printed.
+
+Usage: python benchmarks/bench_startup.py [--tasks 1000] [--repeat 5] [--top 10]
+           [--seed 42] [--workdir DIR] [--target SECONDS]
+
+The exit code is 1 if the median time to first frame is above the target.
+"""
+from datetime import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from generate import write_file
+
+
+# the median time to first frame for 1000 tasks was about 0.1 s (with the snapshot cache), with some headroom
+TARGET_SECONDS = 0.15
+FIRST_FRAME_MARKER = b"Options:"
+
+
+def import_times(module: str) -> list[tuple[str, int, int]]:
+    """(module, self us, cumulative us) for every module imported by `import module`."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        times.append((name.strip(), int(own), int(cumulative)))
+    return times
+
+
+def bench_imports(repeat: int, top: int) -> dict:
+    totals = []
+    own_times = {}
+    for _ in range(repeat):
+        times = import_times("todoapp")
+        totals.append(times[-1][2])
+        for name, own, _ in times:
+            own_times.setdefault(name, []).append(own)
+    slowest = sorted(own_times.items(), key=lambda item: statistics.median(item[1]), reverse=True)[:top]
+    return {
+        "todoapp_median": statistics.median(totals) / 1e6,
+        "modules": len(own_times),
+        "slowest": {name: statistics.median(runs) / 1e6 for name, runs in slowest},
+    }
+
+
+def first_frame(filename: str) -> float:
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, "main.py"), filename, "--archive-after", "off"],
+                               cwd=ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        output = b""
+        while FIRST_FRAME_MARKER not in output:
+            chunk = os.read(process.stdout.fileno(), 65536)
+            if not chunk:
+                raise RuntimeError("the app exited before drawing the main menu")
+            output += chunk
+        return time.perf_counter() - start
+    finally:
+        process.kill()
+        process.wait()
+
+
+def main(args: list[str]) -> int:
+    options = {"--tasks": "1000", "--repeat": "5", "--top": "10", "--seed": "42",
+               "--workdir": None, "--target": str(TARGET_SECONDS)}
+    for i in range(0, len(args), 2):
+        if args[i] not in options or i + 1 >= len(args):
+            print(__doc__)
+            return 1
+        options[args[i]] = args[i + 1]
+    count = int(options["--tasks"])
+    repeat = int(options["--repeat"])
+    seed = int(options["--seed"])
+    target = float(options["--target"])
+    workdir = options["--workdir"] or os.path.join(tempfile.gettempdir(), "todos-bench")
+    os.makedirs(workdir, exist_ok=True)
+    filename = os.path.join(workdir, f"startup-{count}-{seed}.yaml")
+    if not os.path.exists(filename):
+        write_file(filename, count, seed)
+
+    frames = [first_frame(filename) for _ in range(repeat)]
+    results = {
+        "meta": {
+            "started": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "tasks": count,
+            "repeat": repeat,
+        },
+        "imports": bench_imports(repeat, int(options["--top"])),
+        "first_frame": {"min": min(frames), "median": statistics.median(frames), "runs": frames, "target": target},
+    }
+    print(json.dumps(results, indent=2))
+
+    if results["first_frame"]["median"] > target:
+        print(f"time to first frame {results['first_frame']['median'] * 1000:.0f} ms is above the target of {target * 1000:.0f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,188 @@
+"""Time the hot paths of the app on generated lists and write the results as JSON.
+
+Measured per list size: ToDoList.load (from the snapshot cache, cold
+with the cache written, and with the cache turned off), save (full and
+journaled), ToDoApp._menu_calculations, find_task, CalendarView.display
+and a full main menu keypress cycle (render + input + handling). Screen output goes to a null sink.
+Generated files are cached in the work directory.
+
+Usage: python benchmarks/bench_suite.py [--sizes 1000,10000,100000] [--repeat 5]
+           [--seed 42] [--reference YYYY-MM-DD] [--workdir DIR] [--out FILE]
+           [--compare BASELINE.json] [--threshold 1.25]
+
+With --compare, every median that got slower than threshold times the
+baseline (and by more than a millisecond, to ignore timer noise) is
+reported and the exit code is 1.
+"""
+from contextlib import redirect_stdout
+from datetime import datetime
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yaml
+from calendar_view import CalendarView
+from save_scheduler import SaveScheduler
+from todoapp import ToDoApp
+from todolist import ToDoList
+import snapshot_cache
+from generate import write_file
+
+
+FIND_QUERIES = ["review", "#12", "zz-not-there", "ta"]
+NOISE_SECONDS = 0.001
+
+
+def sample(fn, repeat: int, setup=None) -> dict:
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return {"min": min(runs), "median": statistics.median(runs), "runs": runs}
+
+
+def make_app(todos: ToDoList, filename: str) -> ToDoApp:
+    app = ToDoApp(filename + ".missing")
+    app.todo_list = todos
+    app.filename = filename
+    # nothing is written while measuring, close() at exit does one save
+    app.saver = SaveScheduler(todos, filename, delay=3600, max_delay=3600)
+    return app
+
+
+def bench_size(count: int, repeat: int, seed: int, reference: datetime, workdir: str) -> dict:
+    source = os.path.join(workdir, f"todos-{count}-{seed}-{reference:%Y%m%d}.yaml")
+    if not os.path.exists(source):
+        write_file(source, count, seed, reference)
+    target = os.path.join(workdir, f"save-{count}.yaml")
+    results = {"file_bytes": os.path.getsize(source)}
+    null = open(os.devnull, "w", encoding="utf-8")
+
+    def load_uncached():
+        todos = ToDoList()
+        todos.use_snapshot_cache = False
+        todos.load(source)
+    def drop_cache():
+        if os.path.exists(snapshot_cache.cache_path(source)):
+            os.remove(snapshot_cache.cache_path(source))
+    # a cold load parses the YAML and writes the snapshot cache, every later one reads it
+    results["load_cold"] = sample(lambda: ToDoList().load(source), repeat, setup=drop_cache)
+    ToDoList().load(source)
+    results["load"] = sample(lambda: ToDoList().load(source), repeat)
+    results["load_uncached"] = sample(load_uncached, repeat)
+    todos = ToDoList()
+    todos.load(source)
+    first = next(iter(todos.tasks))
+
+    results["save"] = sample(lambda: todos.save(target), repeat)
+    todos.journaled = True
+    results["save_journaled"] = sample(lambda: todos.save(target), repeat, setup=first.toggle)
+    todos.journaled = False
+    todos.compact(target)
+
+    app = make_app(todos, target)
+    results["menu_calculations"] = sample(app._menu_calculations, repeat, setup=first.toggle)
+    results["menu_calculations_cached"] = sample(app._menu_calculations, repeat)
+
+    results["find_task_first"] = sample(lambda: todos.find_task(FIND_QUERIES[0]), 1)
+    results["find_task"] = sample(lambda: [todos.find_task(q) for q in FIND_QUERIES], repeat)
+
+    view = CalendarView(todos, reference)
+    with redirect_stdout(null):
+        results["calendar_display"] = sample(view.display, repeat, setup=first.toggle)
+        results["calendar_display_cached"] = sample(view.display, repeat)
+
+    loop = asyncio.new_event_loop()
+    def keypress(cmd):
+        def press():
+            app._start_commands = [cmd]
+            loop.run_until_complete(app._main_menu())
+        return press
+    with redirect_stdout(null):
+        results["keypress_next"] = sample(keypress("n"), repeat)
+        results["keypress_toggle"] = sample(keypress("t"), repeat)
+    loop.close()
+    null.close()
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for size, metrics in results["sizes"].items():
+        base_metrics = baseline.get("sizes", {}).get(size, {})
+        for name, metric in metrics.items():
+            base = base_metrics.get(name)
+            if not isinstance(metric, dict) or not isinstance(base, dict) or base["median"] <= 0:
+                continue
+            ratio = metric["median"] / base["median"]
+            slower = metric["median"] - base["median"] > NOISE_SECONDS
+            flag = "  REGRESSION" if ratio > threshold and slower else ""
+            print(f"{size:>8} {name:<26} {base['median'] * 1000:10.2f} ms -> {metric['median'] * 1000:10.2f} ms  x{ratio:5.2f}{flag}", file=sys.stderr)
+            if flag:
+                regressions.append(f"{size}/{name}")
+    return regressions
+
+
+def main(args: list[str]) -> int:
+    options = {"--sizes": "1000,10000,100000", "--repeat": "5", "--seed": "42", "--reference": None,
+               "--workdir": None, "--out": None, "--compare": None, "--threshold": "1.25"}
+    for i in range(0, len(args), 2):
+        if args[i] not in options or i + 1 >= len(args):
+            print(__doc__)
+            return 1
+        options[args[i]] = args[i + 1]
+    sizes = [int(size) for size in options["--sizes"].split(",")]
+    repeat = int(options["--repeat"])
+    seed = int(options["--seed"])
+    if options["--reference"]:
+        reference = datetime.strptime(options["--reference"], "%Y-%m-%d")
+    else:
+        reference = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    workdir = options["--workdir"] or os.path.join(tempfile.gettempdir(), "todos-bench")
+    os.makedirs(workdir, exist_ok=True)
+
+    results = {
+        "meta": {
+            "started": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "libyaml": bool(yaml.__with_libyaml__),
+            "seed": seed,
+            "reference": reference.date().isoformat(),
+            "repeat": repeat,
+        },
+        "sizes": {},
+    }
+    for count in sizes:
+        print(f"benchmarking {count} tasks...", file=sys.stderr)
+        results["sizes"][str(count)] = bench_size(count, repeat, seed, reference, workdir)
+
+    text = json.dumps(results, indent=2)
+    if options["--out"]:
+        with open(options["--out"], "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if options["--compare"]:
+        with open(options["--compare"], "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, float(options["--threshold"]))
+        if len(regressions) > 0:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,50 @@
+"""Compare the pure-Python and libyaml paths used by ToDoList.load/save.
+
+Usage: python benchmarks/bench_yaml.py [TASK_COUNT ...]
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yaml
+import yaml_io
+from todo import AsLiteral
+from todolist import ToDoList
+from generate import build_list
+
+
+def document(todos: ToDoList) -> dict:
+    return {"ToDos": {"created_by": "bench", "tasks": {task.id: task.to_dict() for task in todos.tasks}}}
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def run(count: int):
+    data = document(build_list(count))
+    paths = [("python", yaml.SafeLoader, yaml.Dumper)]
+    if yaml.__with_libyaml__:
+        paths.append(("libyaml", yaml.CSafeLoader, yaml.CDumper))
+    outputs = {}
+    for name, loader, dumper in paths:
+        if dumper is not yaml.Dumper:
+            yaml.add_representer(AsLiteral, yaml_io.represent_literal, Dumper=dumper)
+        dump_s, text = timed(lambda: yaml.dump(data, Dumper=dumper, **yaml_io.YAML_DUMP_OPTIONS))
+        load_s, _ = timed(lambda: yaml.load(io.StringIO(text), Loader=loader))
+        outputs[name] = text
+        print(f"{count:>8} tasks  {name:<8} dump {dump_s * 1000:9.1f} ms  load {load_s * 1000:9.1f} ms")
+    if len(outputs) > 1:
+        same = outputs["python"] == outputs["libyaml"]
+        print(f"{count:>8} tasks  output identical: {same}")
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000]
+    for count in counts:
+        run(count)
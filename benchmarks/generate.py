@@ -0,0 +1,115 @@
+"""Seeded generator for large synthetic ToDo lists.
+
+The same count, seed and reference date always give the same tasks. Dates
+cluster around the reference date the way a real list does (mostly the
+last and the next few weeks, a long tail into the past and the future),
+past tasks are mostly done, and descriptions range from none to a few KB.
+
+Usage: python benchmarks/generate.py COUNT FILE [--seed N] [--reference YYYY-MM-DD]
+"""
+from datetime import datetime, timedelta
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from todo import ToDo
+from todolist import ToDoList, write_yaml_tasks
+
+
+RECURRING_TITLES = [
+    "Water the plants", "Weekly review", "Pay rent", "Call mom", "Take out the trash",
+    "Backup laptop", "Team meeting notes", "Gym", "Grocery shopping", "Clean the kitchen",
+]
+WORDS = [
+    "fix", "write", "review", "update", "plan", "order", "book", "email", "prepare", "check",
+    "report", "invoice", "tickets", "slides", "garden", "bike", "tax", "dentist", "server", "budget",
+    "draft", "release", "notes", "meeting", "car", "insurance", "photos", "course", "docs", "ünïcödé",
+]
+
+
+def _sentence(rnd: random.Random, words: int) -> str:
+    return " ".join(rnd.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def _description(rnd: random.Random) -> str:
+    r = rnd.random()
+    if r < 0.45:
+        return ""
+    if r < 0.80:
+        return _sentence(rnd, rnd.randint(3, 12))
+    if r < 0.97:
+        return "\n".join(_sentence(rnd, rnd.randint(2, 10)) for _ in range(rnd.randint(2, 10)))
+    # a pasted log or mail, 1-16 KB
+    lines = []
+    size = rnd.randint(1024, 16 * 1024)
+    while size > 0:
+        line = _sentence(rnd, rnd.randint(4, 16))
+        lines.append(line)
+        size -= len(line) + 1
+    return "\n".join(lines)
+
+
+def generate_tasks(count: int, seed: int = 42, reference: datetime|None = None):
+    """Yield count synthetic tasks (not attached to any list)."""
+    rnd = random.Random(seed)
+    if reference is None:
+        reference = datetime.now()
+    reference = reference.replace(hour=0, minute=0, second=0, microsecond=0)
+    for n in range(count):
+        if rnd.random() < 0.3:
+            title = rnd.choice(RECURRING_TITLES)
+        else:
+            title = f"{_sentence(rnd, rnd.randint(1, 5))} #{n}"
+        created = reference - timedelta(seconds=int(rnd.expovariate(1 / (120 * 86400))))
+        planned = None
+        if rnd.random() < 0.75:
+            # most deadlines are near the reference date, some far out in either direction
+            offset = int(rnd.gauss(0, 14)) if rnd.random() < 0.8 else rnd.randint(-730, 365)
+            planned = reference + timedelta(days=offset)
+        task = ToDo(title, _description(rnd), planned)
+        task.id = f"{rnd.getrandbits(64):016x}"
+        task.created_at = min(created, planned) if planned is not None else created
+        past = planned is not None and planned < reference
+        task.state = rnd.random() < (0.85 if past else 0.1)
+        yield task
+
+
+def build_list(count: int, seed: int = 42, reference: datetime|None = None) -> ToDoList:
+    todos = ToDoList()
+    for task in generate_tasks(count, seed, reference):
+        todos.add_task(task)
+    return todos
+
+
+def write_file(filename: str, count: int, seed: int = 42, reference: datetime|None = None):
+    """Write a synthetic list to filename without holding it in memory."""
+    with open(filename, "w", encoding="utf-8") as f:
+        write_yaml_tasks(f, generate_tasks(count, seed, reference), "bench", reference)
+
+
+def main(args: list[str]) -> int:
+    seed = 42
+    reference = None
+    positional = []
+    i = 0
+    while i < len(args):
+        if args[i] == "--seed":
+            seed = int(args[i + 1])
+            i += 1
+        elif args[i] == "--reference":
+            reference = datetime.strptime(args[i + 1], "%Y-%m-%d")
+            i += 1
+        else:
+            positional.append(args[i])
+        i += 1
+    if len(positional) != 2:
+        print(__doc__.strip().splitlines()[-1])
+        return 1
+    write_file(positional[1], int(positional[0]), seed, reference)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
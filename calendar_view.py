@@ -1,11 +1,17 @@
-from datetime import datetime
+import asyncio
+from datetime import datetime, timedelta
 import re
+import threading
 
 
 from consts import *
 from tools import *
 from todo import ToDo
 from todolist import ToDoList
+from screen import Frame
+from profiler import PROFILER, timed
+from render_cache import RenderCache
+from async_input import ainput, run_blocking
 
 
 def _get_chars():
@@ -35,6 +41,10 @@ def line(lengths:list[int], LS:str, HL:str, C:str, RS:str):
     return "".join(line)
 
 
+# calendar rows are the same on every redraw of a month, so they are formatted once
+_row_cache = RenderCache()
+
+
 class TextAlign:
     LEFT = "L"
     CENTER = "C"
@@ -53,6 +63,14 @@ class TextAlign:
 
 
 def cells(lengths_content_color:list[tuple[int,str,str|None]], align:str, LS:str, SPC:str, C:str, RS:str):
+    key = (tuple(lengths_content_color), align, LS, SPC, C, RS, colors_on())
+    row = _row_cache.get(key)
+    if row is None:
+        row = _row_cache.put(key, _format_cells(lengths_content_color, align, LS, SPC, C, RS))
+    return row
+
+
+def _format_cells(lengths_content_color:list[tuple[int,str,str|None]], align:str, LS:str, SPC:str, C:str, RS:str) -> str:
     line = [LS]
     for i, (length, content, color) in enumerate(lengths_content_color):
         if i > 0:
@@ -71,14 +89,17 @@ class CalendarView:
     current_date:datetime
     show_list:bool = False
 
-    def __init__(self, todos:ToDoList, current_date:datetime = None):
+    def __init__(self, todos:ToDoList, current_date:datetime = None, archive = None):
         self.todos = todos
+        self.archive = archive
         if current_date is None:
             self.current_date = datetime.now()
         else:
             self.current_date = current_date
         self.show_list = False
+        self._prefetcher = None # the thread of the last _prefetch_neighbors()
     
+    @timed("calendar_display")
     def display(self):
         #Calculations
         year = self.current_date.year
@@ -92,51 +113,77 @@ class CalendarView:
         view_end_sunday = last_day_of_month + timedelta(days=(6 - last_day_of_month.weekday()))
         TL, TR, BL, BR, LC, RC, TC, BC, HL, VL, MC, DHL, LARR = _get_chars()
 
+        stats = self.todos.month_stats(year, self.current_date.month)
+        today = datetime.now()
+        if self.archive is not None and (year, self.current_date.month) <= (today.year, today.month):
+            # archived tasks are done, they only change the counts of past days
+            stats = dict(stats)
+            for day, (count, done) in self.archive.month_stats(year, self.current_date.month).items():
+                task_count, task_done = stats.get(day, (0, 0))
+                stats[day] = (task_count + count, task_done + done)
+        self._prefetch_neighbors()
         days = [] # list of tuple of (datetime, task count, task done, in month)
         current_day = view_start_monday
         while current_day <= view_end_sunday:
-            day_tasks = self.todos.get_tasks_for_date(current_day)
-            task_count = len(day_tasks)
-            task_done = sum(1 for task in day_tasks if task.state)
             in_month = current_day.month == self.current_date.month
+            task_count, task_done = stats.get(current_day.toordinal(), (0, 0)) if in_month else (0, 0)
             days.append((current_day, task_count, task_done, in_month))
             current_day += timedelta(days=1)
 
         # Printing the calendar view
-        cls()
-        hl(view_width)
-        center(f"{month_name} - {year}", width=view_width, color=COLOR_BRIGHT_MAGENTA)
-        print(line([4] + [CAL_CELL_WIDTH] * 7, TL, HL, TC, TR))
-        print(cells([(4, "CW", COLOR_BRIGHT_YELLOW)] + [(CAL_CELL_WIDTH, day, COLOR_BRIGHT_CYAN) for day in week_days], TextAlign.CENTER, VL, " ", VL, VL))
-        print(line([4] + [CAL_CELL_WIDTH] * 7, LC, DHL, MC, RC))
-        today = datetime.now().date()
-        for i in range(0, len(days), 7):
-            wdays = days[i:i + 7]
-            week_of_year = "%02i" % wdays[0][0].isocalendar()[1]
-            tasks = [(4, "", None)]
-            dates = [(4, week_of_year, COLOR_YELLOW)]
-            for day, task_count, task_done, in_month in wdays:
-                if not in_month or task_count <= 0:
-                    tcontent = ""
-                else:
-                    tcontent = f"{task_done}/{task_count}"
-                tcolor = COLOR_BRIGHT_GREEN if task_done == task_count else COLOR_BRIGHT_YELLOW
-                tasks.append((CAL_CELL_WIDTH, tcontent, tcolor))
-                dcolor = COLOR_WHITE if in_month else COLOR_BRIGHT_BLACK
-                if in_month and day.date() == today:
-                    dcolor = COLOR_BRIGHT_YELLOW
-                dcontent = day.strftime("%d")
-                if day.date() == self.current_date.date():
-                    dcontent += " " + LARR
-                dates.append((CAL_CELL_WIDTH, dcontent, dcolor))
-            if i > 0:
-                print(line([4] + ([CAL_CELL_WIDTH] * 7), LC, HL, MC, RC))
-            print(cells(tasks, TextAlign.RIGHT, VL, " ", VL, VL))
-            print(cells(dates, TextAlign.LEFT, VL, " ", VL, VL))
-        print(line([4] + ([CAL_CELL_WIDTH] * 7), BL, HL, BC, BR))
-        self._print_options(view_width)
-        hl(view_width)
+        with Frame():
+            cls()
+            hl(view_width)
+            center(f"{month_name} - {year}", width=view_width, color=COLOR_BRIGHT_MAGENTA)
+            print(line([4] + [CAL_CELL_WIDTH] * 7, TL, HL, TC, TR))
+            print(cells([(4, "CW", COLOR_BRIGHT_YELLOW)] + [(CAL_CELL_WIDTH, day, COLOR_BRIGHT_CYAN) for day in week_days], TextAlign.CENTER, VL, " ", VL, VL))
+            print(line([4] + [CAL_CELL_WIDTH] * 7, LC, DHL, MC, RC))
+            today = datetime.now().date()
+            for i in range(0, len(days), 7):
+                wdays = days[i:i + 7]
+                week_of_year = "%02i" % wdays[0][0].isocalendar()[1]
+                tasks = [(4, "", None)]
+                dates = [(4, week_of_year, COLOR_YELLOW)]
+                for day, task_count, task_done, in_month in wdays:
+                    if not in_month or task_count <= 0:
+                        tcontent = ""
+                    else:
+                        tcontent = f"{task_done}/{task_count}"
+                    tcolor = COLOR_BRIGHT_GREEN if task_done == task_count else COLOR_BRIGHT_YELLOW
+                    tasks.append((CAL_CELL_WIDTH, tcontent, tcolor))
+                    dcolor = COLOR_WHITE if in_month else COLOR_BRIGHT_BLACK
+                    if in_month and day.date() == today:
+                        dcolor = COLOR_BRIGHT_YELLOW
+                    dcontent = day.strftime("%d")
+                    if day.date() == self.current_date.date():
+                        dcontent += " " + LARR
+                    dates.append((CAL_CELL_WIDTH, dcontent, dcolor))
+                if i > 0:
+                    print(line([4] + ([CAL_CELL_WIDTH] * 7), LC, HL, MC, RC))
+                print(cells(tasks, TextAlign.RIGHT, VL, " ", VL, VL))
+                print(cells(dates, TextAlign.LEFT, VL, " ", VL, VL))
+            print(line([4] + ([CAL_CELL_WIDTH] * 7), BL, HL, BC, BR))
+            self._print_options(view_width)
+            hl(view_width)
     
+    def _prefetch_neighbors(self):
+        """Compute the previous and next month in the background so p/n are instant."""
+        year = self.current_date.year
+        month = self.current_date.month
+        neighbors = [
+            (year - 1, 12) if month == 1 else (year, month - 1),
+            (year + 1, 1) if month == 12 else (year, month + 1),
+        ]
+        # loading shards here would change the list under the UI thread
+        missing = [(y, m) for y, m in neighbors if self.todos.is_month_loaded(y, m) and not self.todos.has_month_stats(y, m)]
+        if len(missing) <= 0 or (self._prefetcher is not None and self._prefetcher.is_alive()):
+            return
+        def prefetch():
+            for y, m in missing:
+                self.todos.month_stats(y, m)
+        self._prefetcher = threading.Thread(target=prefetch, name="todos-prefetch", daemon=True)
+        self._prefetcher.start()
+
     def _print_options(self, view_width):
         center("Options: b y+-N m+-N d+-N t p n YYYY-MM-DD l ?", width=view_width, color=COLOR_BRIGHT_CYAN)
     
@@ -191,8 +238,9 @@ class CalendarView:
         elif unit == "d":
             self.current_date += timedelta(days=mult * val)
 
-    def _handle_input(self):
-        cmd = input(": ").strip().lower()
+    def _handle_input(self, cmd: str) -> bool:
+        if len(cmd) <= 0:
+            return True
         cmds = cmd[0]
         if cmd == "b" or cmd == "q" or cmd == CTRL_X_INPUT:
             return False
@@ -213,9 +261,6 @@ class CalendarView:
             self.show_list = True
             return False
 
-        elif cmd == "?":
-            self._print_help()
-
         elif re.match(ISO_DATE_PATTERN, cmd):
             try:
                 self.current_date = datetime.strptime(cmd, "%Y-%m-%d")
@@ -225,7 +270,15 @@ class CalendarView:
         return True
 
     def run(self):
+        asyncio.run(self.run_async())
+
+    async def run_async(self):
         while True:
             self.display()
-            if not self._handle_input():
+            if PROFILER.enabled:
+                print(" " + colorize(PROFILER.status_line(["calendar_display", "terminal_write"]), COLOR_BRIGHT_BLACK))
+            cmd = (await ainput(": ")).strip().lower()
+            if cmd == "?":
+                await run_blocking(self._print_help)
+            elif not self._handle_input(cmd):
                 break
\ No newline at end of file
@@ -3,9 +3,24 @@ HL_SIZE = 80
 CHAR_SET =       "✔─▶◀┌┐└┘├┤┬┴─│┼═"
 ASCII_CHAR_SET =  "X_><++++++++-|+="
 DEFAULT_FILENAME = "todos.yaml"
+SAVE_DELAY = 0.5 # seconds of quiet before a scheduled save is written
+SAVE_MAX_DELAY = 3.0 # longest a scheduled save may be pushed back by further edits
+SAVE_CLOSE_TIMEOUT = 10.0 # seconds the app waits for the last save on exit
+JOURNAL_COMPACT_SIZE = 256 * 1024 # bytes of journal before it is folded back into the YAML file
+ARCHIVE_AFTER_DAYS = None # tasks completed longer ago are moved to the archive on start, None to never archive
+SHARD_WINDOW_MONTHS = 1 # past months of a sharded list that are always loaded, older ones only when viewed or when they have open tasks
 ISO_DATE_PATTERN = r"^\d{4}-\d{2}-\d{2}$"
 TIME_JUMP_PATTERN = r"^[ymd][+-]\d+$"
 CAL_CELL_WIDTH = 7
+LAZY_COMPRESS_SIZE = 1024 # lazily loaded descriptions at least this long are kept compressed
+MENU_PAGE_SIZE = 10 # rows shown per main menu section
+PROFILE_ENV = "TODOS_PROFILE" # set to 1 (or a report file name) to profile like --profile
+PROFILE_TOP_FUNCTIONS = 40 # functions listed in the cProfile part of the report
+ALERT_SECONDS = 3 # how long a message stays under the menu before it is redrawn away
+WATCH_INTERVAL = 1.0 # seconds between checks for saves of other sessions while a prompt waits
+SNAPSHOT_CACHE_DIRNAME = "todos" # folder in the user cache directory for the binary copies of YAML lists
+SNAPSHOT_CACHE_VERSION = 2 # bump when the cached records change, old caches are then ignored
+RENDER_CACHE_SIZE = 512 # formatted task lines and calendar rows kept between frames
 CTRL_X_INPUT = "\x18" # Ctrl+X
 
 COLOR_RED = "\033[31m"
@@ -27,4 +42,6 @@ COLOR_BRIGHT_CYAN = "\033[96m"
 COLOR_BRIGHT_WHITE = "\033[97m"
 COLOR_BLACK = "\033[30m"
 COLOR_BRIGHT_BLACK = "\033[90m"
-COLOR_RESET = "\033[0m"
\ No newline at end of file
+COLOR_RESET = "\033[0m"
+
+CLEAR_SCREEN = "\033[H\033[2J\033[3J" # cursor home, clear screen, clear scrollback
\ No newline at end of file
@@ -0,0 +1,59 @@
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+def lock_path(filename: str) -> str:
+    return filename.rstrip("/\\") + ".lock"
+
+
+class FileLock:
+    """Advisory lock shared by all processes working on the same ToDo file.
+
+    The lock lives in a separate `<filename>.lock` file, so the data file
+    itself can still be replaced atomically while the lock is held. The
+    lock file is never removed; deleting it would let two processes lock
+    different files.
+
+    Usage:
+        with FileLock(lock_path(filename)):
+            ...
+    """
+
+    filename: str
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._fd = None
+
+    def __enter__(self):
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(self.filename, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            else:
+                # LK_LOCK retries for about ten seconds before giving up
+                msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+        except BaseException:
+            os.close(self._fd)
+            self._fd = None
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+        return False
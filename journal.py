@@ -0,0 +1,96 @@
+from datetime import date, datetime
+import json
+import os
+
+
+DATE_FIELDS = ("created", "planned", "completed", "created_at", "planned_at", "completed_at")
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot journal value of type {type(value).__name__}")
+
+
+def decode_value(field: str, value):
+    """Turn a journaled value back into the type the task attribute expects."""
+    if field in DATE_FIELDS and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def encode_record(record: dict) -> str:
+    return json.dumps(record, default=_json_default, ensure_ascii=False)
+
+
+_RECORD_START = '{"op": '
+
+
+def _decode_line(line: str) -> dict|None:
+    """The record on line, or the one appended right after a torn record on the same line. None if there is none."""
+    start = 0
+    while start >= 0:
+        try:
+            return json.loads(line[start:])
+        except ValueError:
+            start = line.find(_RECORD_START, start + 1)
+    return None
+
+
+class ChangeJournal:
+    """Append-only sidecar log of task mutations, one JSON record per line."""
+
+    filename: str
+    torn: bool
+
+    def __init__(self, filename: str):
+        self.filename = filename + ".journal"
+        self.torn = False # read() came across a line it could not decode
+
+    def exists(self) -> bool:
+        return os.path.exists(self.filename)
+
+    def size(self) -> int:
+        try:
+            return os.path.getsize(self.filename)
+        except OSError:
+            return 0
+
+    def append(self, lines: list[str]):
+        if len(lines) <= 0:
+            return
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        with open(self.filename, "ab+") as f:
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    # a crash tore the last record, it must not swallow the first new one
+                    data = b"\n" + data
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read(self):
+        """Yield the journaled records in order.
+
+        Torn lines (e.g. from a crash during append) are skipped and set
+        torn, the records appended after them are still read.
+        """
+        if not self.exists():
+            return
+        with open(self.filename, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.strip()
+                if len(line) <= 0:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    self.torn = True
+                    record = _decode_line(line)
+                    if record is not None:
+                        yield record
+
+    def clear(self):
+        if self.exists():
+            os.remove(self.filename)
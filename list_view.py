@@ -0,0 +1,54 @@
+from collections.abc import Sequence
+
+from todo import ToDo
+
+
+class ListView:
+    """A window of page_size rows over one section of the main menu.
+
+    Row indices are global (offset is the index of the section's first
+    task), so one selected index can drive several stacked sections. Only
+    the visible slice of tasks is ever touched.
+    """
+
+    tasks: Sequence[ToDo]
+    offset: int
+    page_size: int
+
+    def __init__(self, tasks: Sequence[ToDo], offset: int = 0, page_size: int = 10):
+        self.tasks = tasks
+        self.offset = offset
+        self.page_size = page_size
+
+    def window(self, selected: int) -> tuple[int, int]:
+        """Return the global [from, to) index range shown for the selected index."""
+        offset = self.offset
+        page_size = self.page_size
+        from_i = offset
+        to_i = from_i + page_size
+        if selected > (to_i - 3):
+            from_i = selected - page_size + 2
+            to_i = selected + 2
+        if (from_i - offset) > (len(self.tasks) - page_size):
+            from_i = (len(self.tasks) - page_size + offset)
+            to_i = (len(self.tasks) + offset)
+        if from_i < offset:
+            from_i = offset
+            to_i = from_i + page_size
+        return from_i, min(to_i, offset + len(self.tasks))
+
+    def visible(self, selected: int) -> list[tuple[int, ToDo]]:
+        from_i, to_i = self.window(selected)
+        rows = self.tasks[from_i - self.offset:to_i - self.offset]
+        return list(enumerate(rows, start=from_i))
+
+    def title_width(self, selected: int) -> int:
+        return max((len(task.title) for _, task in self.visible(selected)), default=0)
+
+
+def page_down(selected: int, total: int, page_size: int = 10) -> int:
+    return max(0, min(total - 1, selected + page_size))
+
+
+def page_up(selected: int, total: int, page_size: int = 10) -> int:
+    return max(0, min(total - 1, selected - page_size))
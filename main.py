@@ -1,11 +1,15 @@
 from datetime import datetime
 import os
+import sys
 
 
 from consts import *
-from todo import *
-from todolist import *
-from todoapp import *
+from tools import *
+from todo import ToDo
+from markdown_io import is_markdown
+from shards import is_shard_dir
+from sqlite_store import is_sqlite
+from profiler import PROFILER
 
 
 def cli_help():
@@ -15,33 +19,79 @@ def cli_help():
     print("  -a, --ascii              Use ASCII character set for the UI")
     print("  -d, --demo               Add demo tasks to the ToDo list")
     print("  -nc, --no-colors         Disable colored output")
+    print("  -j, --journal            Append changes to a journal instead of rewriting the file on every edit")
+    print("  -sd, --search-details    Also match task descriptions when searching by name")
+    print("  --profile                Show frame timings and write a profile report next to the file on exit")
+    print(f"                           (same as setting {PROFILE_ENV}=1, or {PROFILE_ENV}=<report file>)")
+    print("  -b, --batch [CMD ...]    Run commands without the UI and print one JSON result per line;")
+    print("                           every argument after the flag is a command, read from stdin if none")
+    print("  --convert SRC DST        Convert a ToDo file between YAML, Markdown (.md) and SQLite (.db) and exit")
+    print("  --archive-after DAYS|off Archive tasks completed more than DAYS days ago on start (default: off)")
     print("  /<advcmd>                execute an advanced command (e.g., /calendar)")
     print(f"  filename                 The file to load/save the ToDo list (default: ~/{DEFAULT_FILENAME})")
+    print("                           files ending in .md are stored as a Markdown checklist,")
+    print("                           directories ending in .d as one file per planned month,")
+    print("                           files ending in .db, .sqlite or .sqlite3 as an SQLite database")
     print("")
     print("  --uninstall              Uninstall the ToDo app")
     print("")
     print("Example:")
     print("  python main.py --ascii --demo my-todos.md")
+    print("  python main.py ./my-todos.yaml --batch \"add 'Buy milk' today\" \"query today\"")
     print("")
 
 
 def main(args:list[str]) -> int:
     filename = ""
     add_demo_tasks = False
+    journaled = False
+    search_details = False
     start_commands = []
-    for arg in args:
-        if arg.lower() == "--ascii" or arg.lower() == "-a":
+    batch_commands = None
+    profile = os.environ.get(PROFILE_ENV, "")
+    archive_after = ARCHIVE_AFTER_DAYS
+    skip = 0
+    for i, arg in enumerate(args):
+        if skip > 0:
+            skip -= 1
+        elif arg.lower() == "--batch" or arg.lower() == "-b":
+            batch_commands = args[i + 1:]
+            break
+        elif arg.lower() == "--convert":
+            if len(args) < i + 3:
+                print("Error: --convert needs a source and a target file.")
+                return 1
+            from todolist import convert_file
+            convert_file(args[i + 1], args[i + 2])
+            return 0
+        elif arg.lower() == "--ascii" or arg.lower() == "-a":
             turn_on_ascii()
         elif arg.lower() == "--demo" or arg.lower() == "-d":
             add_demo_tasks = True
         elif arg.lower() == "--no-colors" or arg.lower() == "-nc":
             turn_off_colors()
+        elif arg.lower() == "--journal" or arg.lower() == "-j":
+            journaled = True
+        elif arg.lower() == "--search-details" or arg.lower() == "-sd":
+            search_details = True
+        elif arg.lower() == "--profile":
+            profile = "1"
+        elif arg.lower() == "--archive-after":
+            value = args[i + 1].lower() if i + 1 < len(args) else ""
+            if value == "off":
+                archive_after = None
+            elif value.isnumeric():
+                archive_after = int(value)
+            else:
+                print("Error: --archive-after needs a number of days or 'off'.")
+                return 1
+            skip = 1
         elif arg.lower() == "--help" or arg.lower() == "-h" or arg.lower() == "?" or arg.lower() == "-?":
             cli_help()
             return 0
         elif arg.startswith("/") and arg[1:].count("/") == 0:
             start_commands.append(arg.strip().lower())
-        elif os.path.isabs(arg) or os.path.dirname(arg):  # Check if it's a valid file path
+        elif os.path.isabs(arg) or os.path.dirname(arg) or is_markdown(arg) or is_shard_dir(arg) or is_sqlite(arg) or arg.lower().endswith((".yaml", ".yml")):  # Check if it's a valid file path
             if len(filename) > 0:
                 print("Error: Only one filename can be specified.")
                 return 1
@@ -52,7 +102,29 @@ def main(args:list[str]) -> int:
         home_dir = os.path.expanduser("~")
         filename = os.path.join(home_dir, DEFAULT_FILENAME)
     
+    if len(profile) > 0 and profile != "0":
+        PROFILER.enable(filename + ".profile.txt" if profile == "1" else profile)
+    try:
+        return run_app(filename, batch_commands, start_commands, journaled, search_details, add_demo_tasks, archive_after)
+    finally:
+        report_file = PROFILER.report()
+        if report_file is not None:
+            print(f"Profile written to {report_file}", file=sys.stderr)
+
+
+def run_app(filename: str, batch_commands: list[str]|None, start_commands: list[str], journaled: bool, search_details: bool, add_demo_tasks: bool, archive_after: int|None) -> int:
+    if batch_commands is not None:
+        from batch import BatchRunner
+        runner = BatchRunner(filename)
+        runner.todo_list.journaled = journaled
+        runner.todo_list.search_descriptions = search_details
+        return runner.run(batch_commands if len(batch_commands) > 0 else sys.stdin)
+
+    from todoapp import ToDoApp
     app = ToDoApp(filename)
+    app.todo_list.journaled = journaled
+    app.todo_list.search_descriptions = search_details
+    app.archive_after = archive_after
 
     if add_demo_tasks:
         demotask1 = ToDo("D Task 1", "This is a demo\ntask description.", datetime(2026, 10, 15))
@@ -86,5 +158,4 @@ def main(args:list[str]) -> int:
 
 
 if __name__ == "__main__":
-    import sys
     sys.exit(main(sys.argv[1:]))
\ No newline at end of file
@@ -0,0 +1,103 @@
+from datetime import datetime
+import re
+
+
+from consts import *
+from todo import ToDo
+
+
+TODO_RE = re.compile(TODO_RE_PATTERN)
+_TASK_START_RE = re.compile(r"^- \[(X| )\] ")
+FENCE = "```"
+_ESCAPED_FENCE = "\\`\\`\\`"
+_FENCE_INDENT = "  "
+
+
+def is_markdown(filename: str) -> bool:
+    return filename.lower().endswith((".md", ".markdown"))
+
+
+def task_to_markdown(task: ToDo) -> str:
+    """Render one task as a checklist line, followed by its description in a fenced block."""
+    state = "X" if task.state else " "
+    line = f"- [{state}] {task.title}"
+    if task.planned_at is not None:
+        line += task.planned_at.strftime(" - Deadline: `%Y-%m-%d`")
+    line += task.created_at.strftime(" - Created: `%Y-%m-%d`")
+    description = task._description_text()
+    if not description:
+        return line + "\n"
+    lines = [line, _FENCE_INDENT + FENCE]
+    for text in description.replace(FENCE, _ESCAPED_FENCE).split("\n"):
+        lines.append(_FENCE_INDENT + text)
+    lines.append(_FENCE_INDENT + FENCE)
+    return "\n".join(lines) + "\n"
+
+
+def task_from_markdown(chunk: str) -> ToDo|None:
+    match = TODO_RE.match(chunk)
+    if match is None:
+        return None
+    state, title, _, planned, _, created, details = match.groups()
+    description = ""
+    if details is not None:
+        # the fence's indentation is part of every captured line
+        lines = details.split("\n")[1:-1]
+        indent = len(_FENCE_INDENT)
+        description = "\n".join(line[indent:] if line[:indent].isspace() else line.lstrip() for line in lines)
+        description = description.replace(_ESCAPED_FENCE, FENCE)
+    task = ToDo(title, description, datetime.strptime(planned, "%Y-%m-%d") if planned else None)
+    task.state = state == "X"
+    task.created_at = datetime.strptime(created, "%Y-%m-%d")
+    return task
+
+
+def read_markdown(f):
+    """Yield the tasks of a Markdown checklist one at a time.
+
+    Only the current task is held in memory. Lines that are not part of a
+    task (headings, blank lines, ...) are ignored.
+    """
+    chunk = []
+    start_line = 0
+    in_fence = False
+    has_fence = False
+
+    def finish():
+        task = task_from_markdown("\n".join(chunk))
+        if task is None:
+            raise ValueError(f"Invalid task in Markdown file at line {start_line}")
+        return task
+
+    for number, line in enumerate(f, 1):
+        line = line.rstrip("\r\n")
+        if in_fence:
+            chunk.append(line)
+            in_fence = FENCE not in line
+            continue
+        if _TASK_START_RE.match(line):
+            if len(chunk) > 0:
+                yield finish()
+            chunk = [line]
+            start_line = number
+            has_fence = False
+        elif len(chunk) > 0 and not has_fence and line.lstrip().startswith(FENCE):
+            chunk.append(line)
+            in_fence = True
+            has_fence = True
+        elif len(chunk) > 0:
+            yield finish()
+            chunk = []
+    if len(chunk) > 0:
+        yield finish()
+
+
+def write_markdown(f, tasks, title: str = "ToDos"):
+    """Write a Markdown checklist.
+
+    tasks may be any iterable (it is consumed lazily) of ToDo objects or of
+    lines already rendered with task_to_markdown.
+    """
+    f.write(f"# {title}\n\n")
+    for task in tasks:
+        f.write(task if type(task) is str else task_to_markdown(task))
@@ -0,0 +1,125 @@
+from contextlib import contextmanager
+from datetime import datetime
+import functools
+import threading
+import time
+
+from consts import *
+
+
+class PhaseStats:
+    __slots__ = ("count", "total", "max", "last")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+
+class Profiler:
+    """Collects per-phase timings and an optional cProfile of the UI thread.
+
+    Disabled by default; the timing hooks then cost one attribute check.
+    """
+
+    enabled: bool
+    report_file: str|None
+
+    def __init__(self):
+        self.enabled = False
+        self.report_file = None
+        self.phases = {} # phase name -> PhaseStats, in first-seen order
+        self._lock = threading.Lock()
+        self._profile = None
+
+    def enable(self, report_file: str|None = None, use_cprofile: bool = True):
+        self.enabled = True
+        self.report_file = report_file
+        if use_cprofile:
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            stats = self.phases.get(name)
+            if stats is None:
+                stats = self.phases[name] = PhaseStats()
+            stats.add(seconds)
+
+    @contextmanager
+    def phase(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def status_line(self, names: list[str]) -> str:
+        """The last timing of each named phase, for the live line under a frame."""
+        parts = []
+        with self._lock:
+            for name in names:
+                stats = self.phases.get(name)
+                if stats is not None:
+                    parts.append(f"{name} {stats.last * 1000:.1f}ms")
+        return " | ".join(parts)
+
+    def summary(self) -> str:
+        lines = [f"{'phase':<28}{'count':>8}{'total ms':>12}{'mean ms':>10}{'max ms':>10}"]
+        with self._lock:
+            for name, stats in self.phases.items():
+                mean = stats.total / stats.count if stats.count > 0 else 0.0
+                lines.append(f"{name:<28}{stats.count:>8}{stats.total * 1000:>12.1f}{mean * 1000:>10.2f}{stats.max * 1000:>10.2f}")
+        return "\n".join(lines)
+
+    def report(self) -> str|None:
+        """Stop profiling and write the report. Returns the report file name, if any."""
+        if not self.enabled:
+            return None
+        text = [f"ToDo profile {datetime.now().isoformat(timespec='seconds')}", "", self.summary()]
+        if self._profile is not None:
+            import io
+            import pstats
+            self._profile.disable()
+            out = io.StringIO()
+            pstats.Stats(self._profile, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+            text += ["", out.getvalue()]
+            self._profile = None
+        self.enabled = False
+        if self.report_file is None:
+            print("\n".join(text))
+            return None
+        with open(self.report_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(text) + "\n")
+        return self.report_file
+
+
+PROFILER = Profiler()
+
+
+def timed(name: str):
+    """Decorator recording every call of the function as phase name."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                PROFILER.record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
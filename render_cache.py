@@ -0,0 +1,40 @@
+from collections import OrderedDict
+
+from consts import *
+
+
+class RenderCache:
+    """A bounded map of already formatted lines, the least recently used line is dropped first.
+
+    Keys must contain everything the line depends on (task fields, width,
+    selection, charset, color mode), so entries never need to be invalidated.
+    """
+
+    max_size: int
+
+    def __init__(self, max_size: int = RENDER_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lines = OrderedDict()
+
+    def get(self, key) -> str|None:
+        line = self._lines.get(key)
+        if line is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._lines.move_to_end(key)
+        return line
+
+    def put(self, key, line: str) -> str:
+        self._lines[key] = line
+        if len(self._lines) > self.max_size:
+            self._lines.popitem(last=False)
+        return line
+
+    def clear(self):
+        self._lines.clear()
+
+    def __len__(self) -> int:
+        return len(self._lines)
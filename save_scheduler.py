@@ -0,0 +1,143 @@
+from contextlib import contextmanager
+import atexit
+import os
+import threading
+import time
+
+from consts import *
+
+
+@contextmanager
+def atomic_open(filename: str, encoding: str = "utf-8"):
+    """Open a temp file next to filename that replaces it once the block succeeds.
+
+    The data is fsynced before the rename, so a crash leaves either the old
+    or the new file on disk, never a truncated one. A symlinked filename
+    is written through to its target, like open() does.
+    """
+    import tempfile
+    filename = os.path.realpath(filename)
+    directory = os.path.dirname(filename)
+    fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=os.path.basename(filename) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding=encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(filename):
+            os.chmod(tmp_name, os.stat(filename).st_mode & 0o777)
+        else:
+            # mkstemp creates 0600 files, new files should follow the umask like open() does
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_name, 0o666 & ~umask)
+        os.replace(tmp_name, filename)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+    _fsync_dir(directory)
+
+
+def _fsync_dir(directory: str):
+    """Make a rename in directory survive a crash. Not possible (nor needed) on Windows."""
+    if os.name == "nt":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class SaveScheduler:
+    """Coalesces save requests into debounced writes on a background thread."""
+
+    filename: str
+    delay: float
+    max_delay: float
+    error: Exception|None
+
+    def __init__(self, todo_list, filename: str, delay: float = SAVE_DELAY, max_delay: float = SAVE_MAX_DELAY):
+        self.todo_list = todo_list
+        self.filename = filename
+        self.delay = delay
+        self.max_delay = max_delay
+        self.error = None
+        self._cond = threading.Condition()
+        self._due = None # monotonic time at which the pending save runs
+        self._first_request = None
+        self._saving = False
+        self._closed = False
+        self._thread = None
+        atexit.register(self.close)
+
+    def request(self):
+        """Schedule a save, pushing back a pending one unless it waited max_delay already."""
+        with self._cond:
+            now = time.monotonic()
+            if self._first_request is None:
+                self._first_request = now
+            self._due = min(now + self.delay, self._first_request + self.max_delay)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="todos-save", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def pending(self) -> bool:
+        with self._cond:
+            return self._due is not None or self._saving
+
+    def wait(self, timeout: float|None = None) -> bool:
+        """Block until all requested saves are written. Returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._due is None and not self._saving, timeout)
+
+    def flush(self, timeout: float|None = None) -> bool:
+        """Run a pending save right away and wait for it."""
+        with self._cond:
+            if self._due is not None:
+                self._due = time.monotonic()
+                self._cond.notify_all()
+        return self.wait(timeout)
+
+    def close(self, timeout: float|None = SAVE_CLOSE_TIMEOUT) -> bool:
+        """Write a pending save and stop the thread. Returns False if the save did not finish within timeout."""
+        done = self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        return done
+
+    def pop_error(self) -> Exception|None:
+        with self._cond:
+            error = self.error
+            self.error = None
+            return error
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._due is not None:
+                        remaining = self._due - time.monotonic()
+                        if remaining <= 0 or self._closed:
+                            break
+                        self._cond.wait(remaining)
+                    elif self._closed:
+                        self._thread = None
+                        return
+                    else:
+                        self._cond.wait()
+                self._due = None
+                self._first_request = None
+                self._saving = True
+            try:
+                self.todo_list.save(self.filename)
+            except Exception as e:
+                with self._cond:
+                    self.error = e
+            finally:
+                with self._cond:
+                    self._saving = False
+                    self._cond.notify_all()
@@ -0,0 +1,52 @@
+from contextlib import redirect_stdout
+import io
+import os
+import sys
+
+from consts import *
+from profiler import PROFILER
+
+
+_ansi_ready = False
+
+
+def enable_ansi():
+    """Make sure the terminal interprets ANSI escape sequences."""
+    global _ansi_ready
+    if _ansi_ready:
+        return
+    if os.name == "nt":
+        # Windows consoles enable VT processing once any child touched them.
+        os.system("")
+    _ansi_ready = True
+
+
+def clear_screen():
+    enable_ansi()
+    sys.stdout.write(CLEAR_SCREEN)
+
+
+class Frame:
+    """Buffers everything printed inside the block and writes it out in a single call.
+
+    Usage:
+        with Frame():
+            cls()
+            hl()
+            print("...")
+    """
+
+    def __enter__(self):
+        enable_ansi()
+        self._out = sys.stdout
+        self._buffer = io.StringIO()
+        self._redirect = redirect_stdout(self._buffer)
+        self._redirect.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._redirect.__exit__(exc_type, exc, tb)
+        with PROFILER.phase("terminal_write"):
+            self._out.write(self._buffer.getvalue())
+            self._out.flush()
+        return False
@@ -0,0 +1,70 @@
+from todo import ToDo
+
+
+def trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """Trigram index for case-insensitive substring search over task titles.
+
+    Queries of three or more characters only look at tasks that contain all
+    of the query's trigrams; shorter queries scan the pre-lowered texts.
+    Descriptions can be included as well.
+    """
+
+    include_descriptions: bool
+
+    def __init__(self, include_descriptions: bool = False):
+        self.include_descriptions = include_descriptions
+        self._texts = {} # packed task id -> lowered searchable text(s)
+        self._grams = {} # trigram -> ids of tasks containing it
+
+    def _task_texts(self, task: ToDo) -> tuple[str, ...]:
+        if self.include_descriptions and task.description:
+            return (task.title.lower(), task.description.lower())
+        return (task.title.lower(),)
+
+    def add(self, task: ToDo):
+        texts = self._task_texts(task)
+        self._texts[task._id] = texts
+        for gram in set().union(*(trigrams(text) for text in texts)):
+            ids = self._grams.get(gram)
+            if ids is None:
+                self._grams[gram] = {task._id}
+            else:
+                ids.add(task._id)
+
+    def remove(self, task: ToDo):
+        texts = self._texts.pop(task._id, None)
+        if texts is None:
+            return
+        for gram in set().union(*(trigrams(text) for text in texts)):
+            ids = self._grams.get(gram)
+            if ids is None:
+                continue
+            ids.discard(task._id)
+            if len(ids) <= 0:
+                del self._grams[gram]
+
+    def update(self, task: ToDo):
+        self.remove(task)
+        self.add(task)
+
+    def search(self, search: str) -> list[str]:
+        """Return the packed ids of all tasks whose text contains search (already lowered)."""
+        if len(search) < 3:
+            return [task_id for task_id, texts in self._texts.items() if any(search in text for text in texts)]
+        postings = []
+        for gram in trigrams(search):
+            ids = self._grams.get(gram)
+            if ids is None:
+                return []
+            postings.append(ids)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for ids in postings[1:]:
+            candidates &= ids
+            if len(candidates) <= 0:
+                return []
+        return [task_id for task_id in candidates if any(search in text for text in self._texts[task_id])]
@@ -0,0 +1,51 @@
+from datetime import date
+import os
+
+
+UNDATED_SHARD = "undated"
+MANIFEST_FILENAME = "manifest.yaml"
+SHARD_SUFFIX = ".yaml"
+
+
+def is_shard_dir(filename: str) -> bool:
+    """Sharded lists are stored in a directory, named like `todos.d`."""
+    return filename.rstrip("/\\").endswith(".d") or os.path.isdir(filename)
+
+
+def shard_key(day: int|None) -> str:
+    """The shard a task planned on day (an ordinal) belongs to: `YYYY-MM` or `undated`."""
+    if day is None:
+        return UNDATED_SHARD
+    d = date.fromordinal(day)
+    return f"{d.year:04d}-{d.month:02d}"
+
+
+def month_key(year: int, month: int) -> str:
+    return f"{year:04d}-{month:02d}"
+
+
+def shard_range(key: str) -> tuple[int, int]:
+    """First day ordinal of the shard's month and of the month after it."""
+    year, month = int(key[:4]), int(key[5:7])
+    first = date(year, month, 1).toordinal()
+    end = date(year + month // 12, month % 12 + 1, 1).toordinal()
+    return first, end
+
+
+def shard_path(dirname: str, key: str) -> str:
+    return os.path.join(dirname, key + SHARD_SUFFIX)
+
+
+def manifest_path(dirname: str) -> str:
+    return os.path.join(dirname, MANIFEST_FILENAME)
+
+
+def shards_on_disk(dirname: str) -> list[str]:
+    """The keys of all shard files in dirname, whether the manifest knows them or not."""
+    if not os.path.isdir(dirname):
+        return []
+    keys = []
+    for name in os.listdir(dirname):
+        if name.endswith(SHARD_SUFFIX) and name != MANIFEST_FILENAME:
+            keys.append(name[:-len(SHARD_SUFFIX)])
+    return sorted(keys)
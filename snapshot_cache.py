@@ -0,0 +1,87 @@
+"""A binary copy of the tasks of a YAML file, so unchanged files load without parsing YAML.
+
+The cache lives in the user cache directory, one marshal file per list,
+and is only used while the path, mtime, size and CRC-32 of the YAML file
+still match the ones it was written for.
+"""
+import marshal
+import os
+import sys
+import zlib
+
+from consts import *
+from todo import LazyText, ToDo, pack_time, unpack_time
+
+
+def cache_dir() -> str:
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, SNAPSHOT_CACHE_DIRNAME)
+
+
+def cache_path(filename: str) -> str:
+    filename = os.path.abspath(filename)
+    return os.path.join(cache_dir(), f"{os.path.basename(filename)}-{zlib.crc32(filename.encode('utf-8')):08x}.marshal")
+
+
+def _file_key(filename: str) -> tuple:
+    filename = os.path.abspath(filename)
+    with open(filename, "rb") as f:
+        stat = os.fstat(f.fileno())
+        crc = zlib.crc32(f.read())
+    return (filename, stat.st_mtime_ns, stat.st_size, crc)
+
+
+def task_record(task: ToDo) -> tuple:
+    description = task._description
+    if type(description) is LazyText:
+        description = (description.raw, description.indent, description.chomp)
+    return (task._id, task._title, task._done, task._created_at, task._planned_at, description)
+
+
+def task_from_record(record: tuple, lazy_details: bool = True) -> ToDo:
+    task = ToDo.__new__(ToDo)
+    task._id, title, task._done, task._created_at, task._planned_at, description = record
+    task._seq = 0
+    task._title = sys.intern(title) if type(title) is str else title
+    if type(description) is tuple:
+        text = LazyText.__new__(LazyText)
+        text.raw, text.indent, text.chomp = description
+        description = text if lazy_details else text.text()
+    task._description = description
+    return task
+
+
+def read(filename: str, lazy_details: bool = True) -> tuple[dict, list[ToDo]]|None:
+    """The file info (created_by, created_date) and tasks cached for filename, None if the cache is missing or stale."""
+    try:
+        with open(cache_path(filename), "rb") as f:
+            version, key, info, records = marshal.load(f)
+        if version != SNAPSHOT_CACHE_VERSION or key != _file_key(filename):
+            return None
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    info["created_date"] = unpack_time(info["created_date"])
+    return info, [task_from_record(record, lazy_details) for record in records]
+
+
+def write(filename: str, created_by: str, created_date, records: list[tuple]):
+    """Cache records for filename as it is on disk now. Lists that cannot be marshalled (timezones) are not cached."""
+    info = {"created_by": created_by, "created_date": pack_time(created_date)}
+    try:
+        data = marshal.dumps((SNAPSHOT_CACHE_VERSION, _file_key(filename), info, records))
+    except (OSError, ValueError):
+        return
+    path = cache_path(filename)
+    tmp_name = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_name, "wb") as f:
+            f.write(data)
+        # a crash only loses the cache, so it is not fsynced
+        os.replace(tmp_name, path)
+    except OSError:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
@@ -0,0 +1,188 @@
+from datetime import datetime
+import threading
+
+from todo import ToDo, pack_id, unpack_id
+
+
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    state INTEGER NOT NULL,
+    created TEXT NOT NULL,
+    planned TEXT,
+    planned_day INTEGER,
+    completed TEXT,
+    details TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS tasks_seq ON tasks (seq);
+CREATE INDEX IF NOT EXISTS tasks_planned_day ON tasks (planned_day);
+CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state);
+"""
+
+# substring search on titles; the triggers keep the index in step with the tasks table
+_TITLE_INDEX = """
+CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5 (title, content = 'tasks', tokenize = 'trigram');
+CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+    INSERT INTO tasks_fts (rowid, title) VALUES (new.rowid, new.title);
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+    INSERT INTO tasks_fts (tasks_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title ON tasks BEGIN
+    INSERT INTO tasks_fts (tasks_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+    INSERT INTO tasks_fts (rowid, title) VALUES (new.rowid, new.title);
+END;
+DROP INDEX IF EXISTS tasks_title;
+"""
+
+_COLUMNS = "id, title, state, created, planned, completed, details"
+
+_UPSERT = """
+INSERT INTO tasks (id, seq, title, state, created, planned, planned_day, completed, details)
+VALUES (?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM tasks), ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    title = excluded.title, state = excluded.state, created = excluded.created,
+    planned = excluded.planned, planned_day = excluded.planned_day,
+    completed = excluded.completed, details = excluded.details
+"""
+
+
+def is_sqlite(filename: str) -> bool:
+    return filename.lower().endswith(SQLITE_SUFFIXES)
+
+
+def _encode_time(value: datetime|None) -> str|None:
+    return value.isoformat() if value is not None else None
+
+
+def _decode_time(value: str|None) -> datetime|None:
+    return datetime.fromisoformat(value) if value is not None else None
+
+
+def task_to_row(task: ToDo) -> tuple:
+    """The values of _UPSERT for task, in order."""
+    return (
+        task.id,
+        task.title,
+        1 if task.state else 0,
+        _encode_time(task.created_at),
+        _encode_time(task.planned_at),
+        task.planned_day(),
+        _encode_time(task.completed_at),
+        task._description_text(),
+    )
+
+
+def task_from_row(row: tuple) -> ToDo:
+    task_id, title, state, created, planned, completed, details = row
+    task = ToDo(title=title, description=details, planned_at=_decode_time(planned))
+    task.id = task_id
+    task.state = bool(state)
+    task.created_at = _decode_time(created)
+    task.completed_at = _decode_time(completed) if state else None
+    return task
+
+
+class SqliteStore:
+    """A ToDo list stored as one row per task in an SQLite database (WAL mode).
+
+    Tasks are indexed by planned day and state, and titles by trigrams
+    (FTS5), so a month or a title search is one indexed query. Saving
+    writes only the rows of the tasks that changed.
+    """
+
+    filename: str
+
+    def __init__(self, filename: str):
+        import sqlite3
+        self.filename = filename
+        self._lock = threading.Lock() # one connection, shared by the UI and the background saver
+        self._db = sqlite3.connect(filename, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("PRAGMA synchronous = NORMAL")
+        self._db.create_function("py_lower", 1, str.lower, deterministic=True)
+        with self._db:
+            self._db.executescript(_SCHEMA)
+        self._title_index = self._create_title_index()
+
+    def _create_title_index(self) -> bool:
+        """Add the trigram index of the titles, filled from the rows already there. False if SQLite lacks FTS5 trigrams."""
+        import sqlite3
+        exists = self._db.execute("SELECT 1 FROM sqlite_master WHERE name = 'tasks_fts'").fetchone() is not None
+        try:
+            with self._db:
+                self._db.executescript(_TITLE_INDEX)
+                if not exists:
+                    self._db.execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')")
+        except sqlite3.OperationalError:
+            # SQLite before 3.34 or built without FTS5, searches scan the titles
+            return False
+        return True
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def read_meta(self) -> dict:
+        with self._lock:
+            return dict(self._db.execute("SELECT key, value FROM meta"))
+
+    def days(self) -> list[int|None]:
+        """Every distinct planned day ordinal (None for undated tasks), from the index."""
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT DISTINCT planned_day FROM tasks ORDER BY planned_day")]
+
+    def _tasks(self, where: str, params: tuple = ()) -> list[ToDo]:
+        with self._lock:
+            rows = self._db.execute(f"SELECT {_COLUMNS} FROM tasks WHERE {where} ORDER BY seq", params).fetchall()
+        return [task_from_row(row) for row in rows]
+
+    def working_set(self, first_day: int) -> list[ToDo]:
+        """Undated and open tasks, and all tasks planned on first_day or later."""
+        return self._tasks("planned_day IS NULL OR planned_day >= ? OR state = 0", (first_day,))
+
+    def tasks_between(self, first_day: int, end_day: int) -> list[ToDo]:
+        return self._tasks("planned_day >= ? AND planned_day < ?", (first_day, end_day))
+
+    def undated_tasks(self) -> list[ToDo]:
+        return self._tasks("planned_day IS NULL")
+
+    def tasks_by_id(self, ids: list[int|str]) -> list[ToDo]:
+        """The tasks with the given packed ids (pack_id), as the list keys them."""
+        tasks = []
+        # stay below SQLite's limit of bound parameters per statement
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            tasks += self._tasks(f"id IN ({', '.join('?' * len(chunk))})", tuple(unpack_id(task_id) for task_id in chunk))
+        return tasks
+
+    def find_ids(self, search: str) -> list[int|str]:
+        """Packed ids of the tasks whose title contains search (already lowered).
+
+        Searches of three or more characters are looked up in the trigram
+        index, shorter ones scan the titles.
+        """
+        with self._lock:
+            if self._title_index and len(search) >= 3:
+                phrase = '"' + search.replace('"', '""') + '"'
+                rows = self._db.execute("SELECT tasks.id, tasks.title FROM tasks_fts JOIN tasks ON tasks.rowid = tasks_fts.rowid WHERE tasks_fts MATCH ?", (phrase,))
+                # the index folds case a little differently than str.lower()
+                return [pack_id(task_id) for task_id, title in rows if search in title.lower()]
+            return [pack_id(row[0]) for row in self._db.execute("SELECT id FROM tasks WHERE instr(py_lower(title), ?) > 0", (search,))]
+
+    def write(self, meta: dict, rows: list[tuple], deleted: list[int|str], replace_all: bool = False):
+        """Upsert rows and delete packed ids in one transaction; replace_all drops every other row first."""
+        with self._lock, self._db:
+            if replace_all:
+                self._db.execute("DELETE FROM tasks")
+            self._db.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", meta.items())
+            self._db.executemany(_UPSERT, rows)
+            self._db.executemany("DELETE FROM tasks WHERE id = ?", ((unpack_id(task_id),) for task_id in deleted))
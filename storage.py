@@ -0,0 +1,413 @@
+"""The formats a ToDoList is stored in.
+
+A ToDoList reads, writes and watches its file through the Storage that
+open_storage() picks by file name: one YAML file (with a change journal
+in journaled mode), a Markdown checklist, a directory of month shards or
+an SQLite database. The two month formats only load the working window
+on start and the other months when something asks for them.
+"""
+from datetime import datetime
+import os
+
+from consts import *
+from journal import ChangeJournal
+from save_scheduler import atomic_open
+from shards import UNDATED_SHARD, is_shard_dir, manifest_path, month_key, shard_key, shard_path, shard_range, shards_on_disk
+from markdown_io import is_markdown, read_markdown, task_to_markdown, write_markdown
+from sqlite_store import SqliteStore, is_sqlite, task_to_row
+import snapshot_cache
+
+
+def file_stamp(filename: str) -> tuple|None:
+    try:
+        st = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    # atomic saves always create a new inode, even within one mtime tick
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def read_yaml(filename: str, lazy_details: bool = True):
+    import yaml_io
+    return yaml_io.read_file(filename, lazy_details)
+
+
+def working_window_start() -> str:
+    """The oldest month whose tasks are all loaded on start."""
+    today = datetime.now()
+    months = today.year * 12 + today.month - 1 - SHARD_WINDOW_MONTHS
+    return month_key(months // 12, months % 12 + 1)
+
+
+class Storage:
+    """Where a ToDoList is kept. Subclasses implement one file format.
+
+    load() fills a cleared list while it is loading, write() takes the
+    list's changes under its lock and writes the file outside it. The
+    month methods do nothing for formats that are always loaded completely.
+    """
+
+    filename: str
+    journaled = False # saves may append to a change journal instead of rewriting the file
+    has_ids = True # without task ids a changed file can only be reloaded as a whole, not merged
+    dirty = frozenset() # month keys to rewrite on the next write
+
+    def __init__(self, filename: str):
+        self.filename = filename
+
+    def stamps(self) -> tuple:
+        """What changes when another process saves, compared to notice that it did."""
+        return (file_stamp(self.filename),)
+
+    def load(self, todo_list: 'ToDoList'):
+        raise NotImplementedError
+
+    def write(self, todo_list: 'ToDoList'):
+        """Write the list and hand its local changes over to the file, or give them back if that fails."""
+        raise NotImplementedError
+
+    def can_stream(self) -> bool:
+        """Whether read_tasks() and write_tasks() convert the file one task at a time."""
+        return False
+
+    def read_tasks(self):
+        raise NotImplementedError
+
+    def write_tasks(self, f, tasks):
+        raise NotImplementedError
+
+    def find_ids(self, search: str) -> list:
+        """Packed ids of stored tasks whose title contains search (already lowered) that may not be in memory."""
+        return []
+
+    def load_tasks(self, todo_list: 'ToDoList', ids: list):
+        """Add the stored tasks with these packed ids to the list."""
+
+    def is_loaded(self, key: str) -> bool:
+        return True
+
+    def load_month(self, todo_list: 'ToDoList', key: str):
+        """Add the tasks of one month (or UNDATED_SHARD) to the list; ToDoList._ensure_shard() calls this."""
+
+    def month_keys(self) -> list[str]:
+        """Every month stored, loaded or not."""
+        return []
+
+    def mark_dirty(self, todo_list: 'ToDoList', day: int|None):
+        pass
+
+    def catch_up(self, todo_list: 'ToDoList', like: 'ToDoList'):
+        """Load into todo_list what like, a list on the same storage, has in memory besides the working window."""
+
+    def take_months(self, other: 'Storage'):
+        """Take over what other, just loaded from the same file for a merge, knows about the months."""
+
+
+class YamlStorage(Storage):
+    """One YAML file. Unchanged files load from the snapshot cache."""
+
+    journaled = True
+
+    def stamps(self) -> tuple:
+        return (file_stamp(self.filename), file_stamp(ChangeJournal(self.filename).filename))
+
+    def load(self, todo_list: 'ToDoList'):
+        if not self._load_cached(todo_list):
+            todo_list._add_loaded_tasks(read_yaml(self.filename, todo_list.lazy_details), self.filename)
+            if not todo_list._needs_snapshot:
+                self._cache_snapshot(todo_list, [snapshot_cache.task_record(task) for task in todo_list._tasks.values()])
+        todo_list._replay(ChangeJournal(self.filename))
+
+    def _load_cached(self, todo_list: 'ToDoList') -> bool:
+        if not todo_list.use_snapshot_cache:
+            return False
+        cached = snapshot_cache.read(self.filename, todo_list.lazy_details)
+        if cached is None:
+            return False
+        info, tasks = cached
+        todo_list.created_by = info["created_by"]
+        todo_list.creation_date = info["created_date"]
+        for task in tasks:
+            todo_list.add_task(task)
+        return True
+
+    def _cache_snapshot(self, todo_list: 'ToDoList', records: list[tuple]):
+        """Remember the tasks of the file as just read or written, for the next load."""
+        if todo_list.use_snapshot_cache:
+            snapshot_cache.write(self.filename, todo_list.created_by, todo_list.creation_date, records)
+
+    def write(self, todo_list: 'ToDoList'):
+        with todo_list.lock:
+            data = todo_list._snapshot_data()
+            records = [snapshot_cache.task_record(task) for task in todo_list._tasks.values()] if todo_list.use_snapshot_cache else []
+            taken = todo_list._take_changes()
+            todo_list._needs_snapshot = True
+        # The file is written outside the lock so the UI keeps running.
+        import yaml_io
+        try:
+            with atomic_open(self.filename) as f:
+                yaml_io.dump(data, f)
+        except BaseException:
+            with todo_list.lock:
+                todo_list._restore_changes(taken)
+            raise
+        ChangeJournal(self.filename).clear()
+        todo_list._needs_snapshot = False
+        self._cache_snapshot(todo_list, records)
+
+    def can_stream(self) -> bool:
+        # a pending journal has to be applied first
+        return not ChangeJournal(self.filename).exists()
+
+    def read_tasks(self):
+        import yaml_io
+        with open(self.filename, "r", encoding="utf-8") as f:
+            yield from yaml_io.iter_yaml_tasks(f)
+
+    def write_tasks(self, f, tasks):
+        import yaml_io
+        yaml_io.write_yaml_tasks(f, tasks)
+
+
+class MarkdownStorage(Storage):
+    """A Markdown checklist. It has no task ids, so it is only reloaded as a whole."""
+
+    has_ids = False
+
+    def load(self, todo_list: 'ToDoList'):
+        with open(self.filename, "r", encoding="utf-8") as f:
+            for task in read_markdown(f):
+                todo_list.add_task(task)
+
+    def write(self, todo_list: 'ToDoList'):
+        with todo_list.lock:
+            chunks = [task_to_markdown(task) for task in todo_list._tasks.values()]
+            taken = todo_list._take_changes()
+        try:
+            with atomic_open(self.filename) as f:
+                write_markdown(f, chunks)
+        except BaseException:
+            with todo_list.lock:
+                todo_list._restore_changes(taken)
+            raise
+
+    def can_stream(self) -> bool:
+        return True
+
+    def read_tasks(self):
+        with open(self.filename, "r", encoding="utf-8") as f:
+            yield from read_markdown(f)
+
+    def write_tasks(self, f, tasks):
+        write_markdown(f, tasks)
+
+
+class MonthStorage(Storage):
+    """Bookkeeping of the formats that store tasks by month."""
+
+    def __init__(self, filename: str):
+        super().__init__(filename)
+        self.shards = {} # shard key -> {"tasks": count, "open": count} as in the manifest (just the keys for SQLite)
+        self.loaded = set()
+        self.dirty = set()
+
+    def is_loaded(self, key: str) -> bool:
+        return key in self.loaded
+
+    def month_keys(self) -> list[str]:
+        return sorted(self.shards)
+
+    def catch_up(self, todo_list: 'ToDoList', like: 'ToDoList'):
+        for key in like._store.loaded:
+            todo_list._ensure_shard(key)
+
+
+class ShardStorage(MonthStorage):
+    """A directory with one YAML file per month and a manifest of task counts, named like `todos.d`."""
+
+    def __init__(self, filename: str):
+        super().__init__(filename)
+        self.dirname = os.path.abspath(filename)
+        self._new = True # nothing read from or written to the directory yet
+
+    def stamps(self) -> tuple:
+        # written after the shards on every save
+        return (file_stamp(manifest_path(self.dirname)),)
+
+    def load(self, todo_list: 'ToDoList'):
+        """Load the manifest and the shards in the working window.
+
+        That is the undated tasks, every month from SHARD_WINDOW_MONTHS ago
+        on, and older months that still have open tasks.
+        """
+        self._new = False
+        if os.path.exists(manifest_path(self.dirname)):
+            import yaml_io
+            with open(manifest_path(self.dirname), "r", encoding="utf-8") as f:
+                manifest = (yaml_io.load(f) or {}).get("ToDos") or {}
+            if "created_date" in manifest:
+                todo_list.creation_date = manifest["created_date"]
+            if "created_by" in manifest:
+                todo_list.created_by = manifest["created_by"]
+            for key, info in (manifest.get("shards") or {}).items():
+                self.shards[str(key)] = info
+        oldest = working_window_start()
+        for key in shards_on_disk(self.dirname):
+            info = self.shards.get(key)
+            if key == UNDATED_SHARD or key >= oldest or info is None or info.get("open", 1) > 0:
+                self.load_month(todo_list, key)
+
+    def load_month(self, todo_list: 'ToDoList', key: str):
+        self.loaded.add(key)
+        path = shard_path(self.dirname, key)
+        if os.path.exists(path):
+            todo_list._add_loaded_tasks(read_yaml(path, todo_list.lazy_details), path)
+
+    def month_keys(self) -> list[str]:
+        return sorted(set(shards_on_disk(self.dirname)) | set(self.shards))
+
+    def mark_dirty(self, todo_list: 'ToDoList', day: int|None):
+        key = shard_key(day)
+        # the shard is rewritten as a whole, so its other tasks must be in memory
+        todo_list._ensure_shard(key)
+        self.dirty.add(key)
+
+    def take_months(self, other: 'ShardStorage'):
+        self.loaded |= other.loaded
+        for key in set(self.shards) | set(other.shards):
+            if key in self.dirty:
+                continue
+            if key in other.shards:
+                self.shards[key] = other.shards[key]
+            else:
+                self.shards.pop(key, None)
+
+    def write(self, todo_list: 'ToDoList'):
+        """Rewrite the dirty month shards and the manifest."""
+        with todo_list.lock:
+            if self._new:
+                # first save into this directory: every shard is new
+                self._new = False
+                self.loaded = {shard_key(task.planned_day()) for task in todo_list._tasks.values()}
+                self.dirty = self.loaded | set(shards_on_disk(self.dirname))
+            dirty = self.dirty
+            self.dirty = set()
+            taken = todo_list._take_changes()
+            shards = {}
+            for key in sorted(dirty):
+                tasks = todo_list._shard_tasks(key)
+                shards[key] = {"ToDos": {"tasks": {task.id: task.to_dict() for task in tasks}}}
+                if len(tasks) > 0:
+                    self.shards[key] = {"tasks": len(tasks), "open": sum(1 for task in tasks if not task.state)}
+                else:
+                    self.shards.pop(key, None)
+            manifest = todo_list._snapshot_data(with_tasks=False)
+            manifest["ToDos"]["shards"] = {key: self.shards[key] for key in sorted(self.shards)}
+        import yaml_io
+        try:
+            os.makedirs(self.dirname, exist_ok=True)
+            for key, data in shards.items():
+                path = shard_path(self.dirname, key)
+                if len(data["ToDos"]["tasks"]) <= 0:
+                    if os.path.exists(path):
+                        os.remove(path)
+                    continue
+                with atomic_open(path) as f:
+                    yaml_io.dump(data, f)
+            with atomic_open(manifest_path(self.dirname)) as f:
+                yaml_io.dump(manifest, f)
+        except BaseException:
+            with todo_list.lock:
+                self.dirty |= dirty
+                todo_list._restore_changes(taken)
+            raise
+
+
+class SqliteStorage(MonthStorage):
+    """An SQLite database, one row per task (SqliteStore). Saves write only the rows of changed tasks."""
+
+    def __init__(self, filename: str):
+        super().__init__(filename)
+        self.db = None # the SqliteStore once the database is read or written
+
+    def stamps(self) -> tuple:
+        # commits of other connections land in the write-ahead log first
+        return (file_stamp(self.filename), file_stamp(self.filename + "-wal"))
+
+    def load(self, todo_list: 'ToDoList'):
+        """Open the database and load the same working window as for shards.
+
+        Open tasks are loaded from every month; the completed tasks of
+        months before the window are loaded when their month is asked for.
+        """
+        self.db = SqliteStore(self.filename)
+        meta = self.db.read_meta()
+        if "created_date" in meta:
+            todo_list.creation_date = datetime.fromisoformat(meta["created_date"])
+        if "created_by" in meta:
+            todo_list.created_by = meta["created_by"]
+        oldest = working_window_start()
+        self.shards = dict.fromkeys(shard_key(day) for day in self.db.days())
+        self.loaded = {key for key in self.shards if key == UNDATED_SHARD or key >= oldest}
+        first, _ = shard_range(oldest)
+        todo_list._add_stored_tasks(self.db.working_set(first))
+
+    def load_month(self, todo_list: 'ToDoList', key: str):
+        self.loaded.add(key)
+        if key == UNDATED_SHARD:
+            todo_list._add_stored_tasks(self.db.undated_tasks())
+        else:
+            todo_list._add_stored_tasks(self.db.tasks_between(*shard_range(key)))
+
+    def find_ids(self, search: str) -> list:
+        if set(self.shards) <= self.loaded:
+            return []
+        # completed tasks of older months are only in the database
+        return self.db.find_ids(search)
+
+    def load_tasks(self, todo_list: 'ToDoList', ids: list):
+        todo_list._add_stored_tasks(self.db.tasks_by_id(ids))
+
+    def catch_up(self, todo_list: 'ToDoList', like: 'ToDoList'):
+        super().catch_up(todo_list, like)
+        # tasks found by a search, outside the loaded months
+        self.load_tasks(todo_list, [task_id for task_id in like._tasks if task_id not in todo_list._tasks])
+
+    def take_months(self, other: 'SqliteStorage'):
+        self.loaded |= other.loaded
+        self.shards.update(other.shards)
+
+    def write(self, todo_list: 'ToDoList'):
+        """Write the rows of the tasks changed since the last save, or all rows into a new file."""
+        with todo_list.lock:
+            full = self.db is None
+            ids = list(todo_list._tasks) if full else list(todo_list._local_changes)
+            rows = [task_to_row(todo_list._tasks[task_id]) for task_id in ids if task_id in todo_list._tasks]
+            deleted = [task_id for task_id in ids if task_id not in todo_list._tasks]
+            info = todo_list._snapshot_data(with_tasks=False)["ToDos"]
+            meta = {key: value.isoformat() if isinstance(value, datetime) else value for key, value in info.items()}
+            taken = todo_list._take_changes()
+        try:
+            store = SqliteStore(self.filename) if full else self.db
+            store.write(meta, rows, deleted, replace_all=full)
+        except BaseException:
+            with todo_list.lock:
+                todo_list._restore_changes(taken)
+            raise
+        if full:
+            with todo_list.lock:
+                # every task is in memory, so nothing in the file is missing from the list
+                self.db = store
+                self.loaded = {shard_key(day) for day in store.days()}
+                self.shards = dict.fromkeys(self.loaded)
+
+
+def open_storage(filename: str) -> Storage:
+    """The Storage for filename: Markdown for `.md`, shards for a directory or `.d`, SQLite for `.db`, else YAML."""
+    if is_markdown(filename):
+        return MarkdownStorage(filename)
+    if is_shard_dir(filename):
+        return ShardStorage(filename)
+    if is_sqlite(filename):
+        return SqliteStorage(filename)
+    return YamlStorage(filename)
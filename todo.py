@@ -1,7 +1,10 @@
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime, timedelta
+import os
+import sys
+import zlib
 
 from consts import *
+from render_cache import RenderCache
 from tools import *
 
 
@@ -9,20 +12,250 @@ class AsLiteral(str):
   pass
 
 
+def new_task_id() -> str:
+    return os.urandom(8).hex()
+
+
+def pack_id(task_id: str) -> int|str:
+    """Store an id as generated by new_task_id() as an int (about half the size of the string).
+
+    Other ids are kept as they are. Lists key their tasks by the packed id.
+    """
+    if len(task_id) == 16:
+        try:
+            value = int(task_id, 16)
+        except ValueError:
+            return task_id
+        # int() also accepts signs, underscores and upper case, those ids must stay as written
+        if format(value, "016x") == task_id:
+            return value
+    return task_id
+
+
+def unpack_id(value: int|str) -> str:
+    if type(value) is int:
+        return format(value, "016x")
+    return value
+
+
+# lines printed by ToDo.print_min, keyed by the shown state and title and everything else the line depends on
+_line_cache = RenderCache()
+
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+_US_PER_DAY = 86400 * 1000000
+
+
+def pack_time(value):
+    """Store a naive datetime as integer microseconds since 1970 (half the size of a datetime).
+
+    Plain dates count as midnight. Timezone-aware values are kept as they are.
+    """
+    if value is None:
+        return None
+    if type(value) is date:
+        value = datetime(value.year, value.month, value.day)
+    if value.tzinfo is not None:
+        return value
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def unpack_time(value) -> datetime|None:
+    if type(value) is not int:
+        return value
+    return _EPOCH + timedelta(microseconds=value)
+
+
+def packed_day(value) -> int|None:
+    """The day ordinal of a packed time."""
+    if value is None:
+        return None
+    if type(value) is int:
+        return _EPOCH_ORDINAL + value // _US_PER_DAY
+    return value.toordinal()
+
+
+class LazyText:
+    """A literal block scalar kept as raw, still indented YAML source until first read.
+
+    Long blocks are held zlib-compressed, which mostly strips the
+    indentation and repetition of long notes.
+    """
+
+    __slots__ = ("raw", "indent", "chomp")
+
+    def __init__(self, raw: str, indent: int, chomp: str):
+        if len(raw) >= LAZY_COMPRESS_SIZE:
+            raw = zlib.compress(raw.encode("utf-8"), 1)
+        self.raw = raw
+        self.indent = indent
+        self.chomp = chomp # "-" strip, "" clip or "+" keep, as in the block header
+
+    def __bool__(self) -> bool:
+        return len(self.raw) > 0
+
+    def text(self) -> str:
+        raw = self.raw
+        if type(raw) is bytes:
+            raw = zlib.decompress(raw).decode("utf-8")
+        lines = raw.split("\n")
+        if lines[-1] == "":
+            lines.pop()
+        lines = [line[self.indent:] for line in lines]
+        if self.chomp == "+":
+            return "\n".join(lines) + "\n"
+        while len(lines) > 0 and lines[-1] == "":
+            lines.pop()
+        text = "\n".join(lines)
+        if self.chomp == "" and len(lines) > 0:
+            text += "\n"
+        return text
+
+
 class ToDo():
 
+    # _done is False while the task is open, True when it is done without a
+    # completion time and the packed completion time otherwise
+    __slots__ = ("_id", "_seq", "_done", "_title", "_description", "_created_at", "_planned_at")
+
+    # the list a task is in sets this on a subclass of its own (ToDoList.add_task), so it takes no room per task
+    _owner = None
+
+    id:str
     state:bool
     title:str
     description:str
     created_at:datetime
-    planned_at:Optional[datetime]
-
-    def __init__(self, title:str="New Task", description:str="", planned_at: Optional[datetime] = None):
-        self.state = False
-        self.title = title
-        self.description = description
-        self.created_at = datetime.now()
-        self.planned_at = planned_at
+    planned_at:datetime|None
+    completed_at:datetime|None
+
+    def __init__(self, title:str="New Task", description:str="", planned_at: datetime|None = None):
+        self._id = pack_id(new_task_id())
+        self._seq = 0
+        self._done = False
+        self._title = sys.intern(title) if type(title) is str else title
+        self._description = description
+        self._created_at = pack_time(datetime.now())
+        self._planned_at = pack_time(planned_at)
+
+    def _changing(self) -> None:
+        if self._owner is not None:
+            self._owner._task_changing(self)
+
+    def _changed(self, field:str, old) -> None:
+        if self._owner is not None:
+            self._owner._task_changed(self, field, old)
+
+    @property
+    def id(self) -> str:
+        return unpack_id(self._id)
+
+    @id.setter
+    def id(self, value:str) -> None:
+        self._id = pack_id(value)
+
+    @property
+    def state(self) -> bool:
+        return self._done is not False
+
+    @state.setter
+    def state(self, value:bool) -> None:
+        self._changing()
+        old = self._done is not False
+        if not value:
+            self._done = False
+        elif not old:
+            self._done = pack_time(datetime.now())
+        self._changed("state", old)
+
+    @property
+    def title(self) -> str:
+        return self._title
+
+    @title.setter
+    def title(self, value:str) -> None:
+        self._changing()
+        old = self._title
+        # Titles repeat a lot (recurring tasks), so equal ones share one string.
+        self._title = sys.intern(value) if type(value) is str else value
+        self._changed("title", old)
+
+    @property
+    def description(self) -> str:
+        if type(self._description) is LazyText:
+            self._description = self._description.text()
+        return self._description
+
+    @description.setter
+    def description(self, value:str) -> None:
+        self._changing()
+        old = self._description
+        self._description = value
+        self._changed("description", old)
+
+    def _description_text(self) -> str:
+        """The description without materializing a lazily loaded one."""
+        if type(self._description) is LazyText:
+            return self._description.text()
+        return self._description
+
+    @property
+    def created_at(self) -> datetime:
+        return unpack_time(self._created_at)
+
+    @created_at.setter
+    def created_at(self, value:datetime) -> None:
+        self._changing()
+        old = self.created_at
+        self._created_at = pack_time(value)
+        self._changed("created_at", old)
+
+    @property
+    def planned_at(self) -> datetime|None:
+        return unpack_time(self._planned_at)
+
+    @planned_at.setter
+    def planned_at(self, value:datetime|None) -> None:
+        self._changing()
+        old = self.planned_at
+        self._planned_at = pack_time(value)
+        self._changed("planned_at", old)
+
+    @property
+    def completed_at(self) -> datetime|None:
+        """When the task was done. Open tasks have no completion time, setting one on them is ignored."""
+        if type(self._done) is bool:
+            return None
+        return unpack_time(self._done)
+
+    @completed_at.setter
+    def completed_at(self, value:datetime|None) -> None:
+        self._changing()
+        old = self.completed_at
+        if self._done is not False:
+            self._done = True if value is None else pack_time(value)
+        self._changed("completed_at", old)
+
+    def done_since(self) -> datetime|None:
+        """When the task was completed, None while it is open.
+
+        Files from before completion times were recorded fall back to the
+        planned or the created date.
+        """
+        if self._done is False:
+            return None
+        if self._done is not True:
+            return unpack_time(self._done)
+        for value in (self._planned_at, self._created_at):
+            if value is not None:
+                return unpack_time(value)
+        return None
+
+    def planned_day(self) -> int|None:
+        """Return the planned date as a day ordinal, or None if the task has no deadline."""
+        return packed_day(self._planned_at)
     
     def toggle(self) -> None:
         """Toggle the state of the task."""
@@ -31,27 +264,51 @@ class ToDo():
     def to_dict(self) -> dict:
         """Convert ToDo object to a dictionary for YAML serialization."""
         task_dict = {}
+        task_dict["title"] = self.title
         task_dict["state"] = self.state
         task_dict["created"] = self.created_at
         if self.planned_at is not None:
             task_dict["planned"] = self.planned_at
-        if self.description:
-            task_dict["details"] = AsLiteral(self.description)
+        if type(self._done) is not bool:
+            task_dict["completed"] = self.completed_at
+        if self._description:
+            task_dict["details"] = AsLiteral(self._description_text())
         return task_dict
     
     @staticmethod
-    def From_dict(title: str, task_dict: dict) -> 'ToDo':
-        """Create a ToDo object from a dictionary."""
+    def From_dict(key: str, task_dict: dict) -> 'ToDo':
+        """Create a ToDo object from a dictionary.
+
+        Current files key tasks by id and store the title inside the task.
+        Older files keyed them by title; those tasks get a fresh id.
+        """
+        if "title" in task_dict:
+            task_id = str(key)
+            title = task_dict["title"]
+        else:
+            task_id = new_task_id()
+            title = str(key)
         task = ToDo(
             title=title,
             description=task_dict.get("details", ""),
             planned_at=task_dict.get("planned")
         )
+        task.id = task_id
         task.state = task_dict["state"]
         task.created_at = task_dict["created"]
+        if task._done is not False:
+            completed = task_dict.get("completed")
+            task._done = True if completed is None else pack_time(completed)
         return task
 
     def print_min(self, prefix:str = "", suffix:str = "", padw:int=0, width:int = HL_SIZE, color:str=None, index:int|None = None, max_index:int|None = None):
+        key = (self._done is not False, self._title, prefix, suffix, padw, width, color, index, max_index, style(), colors_on())
+        line = _line_cache.get(key)
+        if line is None:
+            line = _line_cache.put(key, self._format_min(prefix, suffix, padw, width, color, index, max_index))
+        print(line)
+
+    def _format_min(self, prefix:str, suffix:str, padw:int, width:int, color:str|None, index:int|None, max_index:int|None) -> str:
         check = style(0)
         state = f"[{check}]" if self.state else "[ ]"
         index_str = ""
@@ -63,7 +320,7 @@ class ToDo():
         if len(line) < padw:
             line = line.ljust(padw)
         line = f"{prefix}{line}{suffix}"
-        center(line, width, color=color)
+        return centered(line, width, color=color)
     
     def selectable_fields(self) -> list[str]:
         return ["title", "planned", "created", "description"]
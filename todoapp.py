@@ -1,14 +1,20 @@
-import time
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timedelta
 import re
-
+import sys
 
 from consts import *
 from tools import *
 from todo import ToDo
 from todolist import ToDoList
-from calendar_view import CalendarView
+from save_scheduler import SaveScheduler
+from screen import Frame
+from profiler import PROFILER, timed
+from list_view import ListView, page_down, page_up
+from archive import Archive, archive_done_tasks, archive_path
+from async_input import ainput, reprint_prompt, run_blocking, use_piped_stdin
+
+
+_EDIT_FIELDS = ("state", "title", "description", "created_at", "planned_at")
 
 
 class ToDoApp:
@@ -16,15 +22,27 @@ class ToDoApp:
     todo_list: ToDoList
     filename: str
     _selected_task_index: int
-    _selected_date: Optional[datetime] = None
+    _selected_date: datetime|None = None
     _start_commands: list[str] = []
+    archive_after: int|None = ARCHIVE_AFTER_DAYS
 
     def __init__(self, filename: str):
         self.todo_list = ToDoList()
         self.filename = filename
         self._selected_task_index = 0
         self.todo_list.load(filename)
+        self.saver = SaveScheduler(self.todo_list, filename)
+        self.archive = Archive(archive_path(filename))
+        self._alerts = [] # [message, color] shown under the menu until they expire
+        self._prompt = None # set while the main menu waits for input, redraws are only allowed then
+        self._loop = None
+        self._first_frame = None # drawn by run() before the event loop starts
         self._start_commands = []
+        self._menu_cache = None
+        self._task_positions = {}
+
+    def _save(self):
+        self.saver.request()
     
     def _print_edit_help(self):
         cls()
@@ -51,6 +69,21 @@ class ToDoApp:
         input("Press Enter to return to the edit menu...")
     
     def _edit_task(self, task: ToDo):
+        """The edit dialog.
+
+        It edits a copy, so nothing is locked while it waits for input. The
+        fields changed in it are set in one batch when it closes, and the
+        caller saves them once.
+        """
+        before = ToDo.From_dict(task.id, task.to_dict())
+        draft = ToDo.From_dict(task.id, task.to_dict())
+        self._edit_fields(draft)
+        # compared with the copy, so fields a merge changed meanwhile are kept
+        changes = {field: getattr(draft, field) for field in _EDIT_FIELDS if getattr(draft, field) != getattr(before, field)}
+        if len(changes) > 0:
+            self.todo_list.update_tasks([task], **changes)
+
+    def _edit_fields(self, task: ToDo):
         selectables = task.selectable_fields()
         selection = 0
         while True:
@@ -68,30 +101,27 @@ class ToDoApp:
             elif cmd == "t":
                 task.toggle()
             elif cmd == "e":
+                from editors import edit_date, edit_multiline, edit_string
                 hl()
                 if selected_field == "title":
                     new_title = edit_string("Edit Title:", task.title).strip()
                     task.title = new_title
-                    self.todo_list.save(self.filename)
                 elif selected_field == "planned":
                     new_deadline = edit_date("Edit Deadline:", task.planned_at, True)
                     task.planned_at = new_deadline
-                    self.todo_list.save(self.filename)
                 elif selected_field == "created":
                     new_created = edit_date("Edit Creation Date:", task.created_at)
                     task.created_at = new_created
-                    self.todo_list.save(self.filename)
                 elif selected_field == "description":
                     new_description = edit_multiline("Edit Description:", task.description).strip()
                     task.description = new_description
-                    self.todo_list.save(self.filename)
             elif cmd == "b" or cmd == CTRL_X_INPUT or cmd == "q" or cmd == "":
                 break
             elif cmd == "?":
                 self._print_edit_help()
 
     def _print_help_min(self, max_w: int = HL_SIZE):
-        center("Options: + t d e q ? p n g", max_w, color=COLOR_BRIGHT_CYAN)
+        center("Options: + t d e q ? p n < > g", max_w, color=COLOR_BRIGHT_CYAN)
         hl(max_w)
     
     def _print_help_full(self):
@@ -125,6 +155,10 @@ class ToDoApp:
         print("  n    select next task")
         print("       You can also enter the letter n muiltiple times to go forward several tasks")
         print("")
+        print("  <    select the task one page up")
+        print("")
+        print("  >    select the task one page down")
+        print("")
         print("  g    Go to task by index")
         print("       You can also use nonnumeric input, e.g. `g Test` will go to the first task that contains the word 'Test'")
         print("")
@@ -155,6 +189,9 @@ class ToDoApp:
         print("  /cal")
         print("  /calendar     Opens the calendar view")
         print("")
+        print("  /arc")
+        print("  /archive      Browse archived tasks and restore them")
+        print("")
         print("  /aon")
         print("  /asciion      Turn ASCII mode on")
         print("  /aoff")
@@ -175,13 +212,7 @@ class ToDoApp:
         if len(tasks) <= 0:
             return False
         if len(tasks) == 1:
-            cls()
-            hl()
-            center("Deleting Task:", color=COLOR_BRIGHT_RED)
-            hl()
-            tasks[0].print_min(prefix="  ", suffix="", color=COLOR_BRIGHT_YELLOW)
-            hl()
-            time.sleep(2)
+            notify(f"Deleted: {tasks[0].title}")
             return True
         cls()
         hl()
@@ -221,10 +252,18 @@ class ToDoApp:
         if self._selected_task_index < 0:
             self._selected_task_index = len(all_tasks) - 1
 
+    def next_page(self, all_tasks) -> None:
+        self._selected_task_index = page_down(self._selected_task_index, len(all_tasks), MENU_PAGE_SIZE)
+
+    def previous_page(self, all_tasks) -> None:
+        self._selected_task_index = page_up(self._selected_task_index, len(all_tasks), MENU_PAGE_SIZE)
+
     def _find_tasks(self, cmd:str, all_tasks:list[ToDo]) -> list[ToDo]:
         if len(cmd) > 1:
             search = cmd[1:].strip()
-            found_tasks = self.todo_list.find_task(search, all_tasks)
+            positions = self._task_positions
+            found_tasks = [task for task in self.todo_list.find_task(search) if task in positions]
+            found_tasks.sort(key=lambda task: positions[task])
             if len(found_tasks) > 0:
                 tasks = found_tasks
             else:
@@ -248,150 +287,239 @@ class ToDoApp:
             new_task_title = "New Task"
         return new_task_title
     
-    def _menu_input(self) -> str:
+    async def _menu_input(self) -> str:
         if len(self._start_commands) > 0:
             cmd = self._start_commands.pop(0)
         else:
-            cmd = input(": ").strip() + " "
+            self._prompt = ": "
+            try:
+                cmd = (await ainput(self._prompt)).strip() + " "
+            finally:
+                self._prompt = None
         cmds = cmd[0].lower()
         cmd = cmd.strip()
         return cmds, cmd
     
+    def _menu_tasks(self):
+        # the lock keeps the background saver from merging between taking the revision and the tasks
+        with self.todo_list.lock:
+            key = (self.todo_list.revision, self._selected_date, datetime.now().toordinal())
+            if self._menu_cache is not None and self._menu_cache[0] == key:
+                return self._menu_cache[1:]
+            if self._selected_date is not None:
+                todays_tasks = self.todo_list.get_tasks_for_date(self._selected_date)
+                future_tasks = []
+            else:
+                todays_tasks, future_tasks = self.todo_list.partition_tasks()
+        all_tasks = [*todays_tasks, *future_tasks]
+        self._task_positions = {task: i for i, task in enumerate(all_tasks)}
+        self._menu_cache = (key, todays_tasks, future_tasks, all_tasks)
+        return todays_tasks, future_tasks, all_tasks
+
+    @timed("menu_calculations")
     def _menu_calculations(self):
-        max_w = 16
-        todays_tasks = self.todo_list.get_todays_tasks()
-        if self._selected_date is not None:
-            todays_tasks = self.todo_list.get_tasks_for_date(self._selected_date)
+        todays_tasks, future_tasks, all_tasks = self._menu_tasks()
         todays_len = len(todays_tasks)
-        if self._selected_date is None:
-            future_tasks = self.todo_list.get_upcoming_tasks()
-        else:
-            future_tasks = []
         future_len = len(future_tasks)
-        all_tasks = [*todays_tasks, *future_tasks]
         larr = style(2)
         rarr = style(3)
-        for task in all_tasks:
-            if len(task.title) > max_w:
-                max_w = len(task.title)
-            if max_w > HL_SIZE - 5 - 5:
-                max_w = HL_SIZE - 5 - 5
-                break
+        # Only the rows on screen decide the width, so the cost does not grow with the list.
+        max_w = max(16,
+            ListView(todays_tasks, 0, MENU_PAGE_SIZE).title_width(self._selected_task_index),
+            ListView(future_tasks, todays_len, MENU_PAGE_SIZE).title_width(self._selected_task_index))
+        max_w = min(max_w, HL_SIZE - 5 - 5)
         inner_w = max_w + 4 #  + len("[ ] ")
         inner_w += len(str(len(all_tasks))) + 2 # for index and colon
         max_w = inner_w + 5 + 5 # plus suffix and prefix
         return max_w, todays_len, todays_tasks, inner_w, future_len, future_tasks, larr, rarr, all_tasks
     
-    def _display_list_part(self, tasks:list[ToDo], max_w:int, inner_w:int, larr:str, rarr:str, offset:int=0, page_size:int=10, max_index:int|None=None):
-        from_i = offset
-        to_i = from_i + page_size
-        if self._selected_task_index > (to_i - 3):
-            from_i = self._selected_task_index - page_size + 2
-            to_i = self._selected_task_index + 2
-        if (from_i - offset) > (len(tasks) - page_size):
-            from_i = (len(tasks) - page_size + offset)
-            to_i = (len(tasks) + offset)
-        if from_i < offset:
-            from_i = offset
-            to_i = from_i + page_size
-        for i, task in enumerate(tasks):
-            i += offset
-            if i < from_i or i >= to_i:
-                continue
+    def _display_list_part(self, tasks:list[ToDo], max_w:int, inner_w:int, larr:str, rarr:str, offset:int=0, page_size:int=MENU_PAGE_SIZE, max_index:int|None=None):
+        view = ListView(tasks, offset, page_size)
+        for i, task in view.visible(self._selected_task_index):
             prefix = "     " if i != self._selected_task_index else (" " + larr + larr + larr + " ")
             suffix = "     " if i != self._selected_task_index else (" " + rarr + rarr + rarr + " ")
             color = COLOR_BRIGHT_YELLOW if i == self._selected_task_index else None
             task.print_min(prefix, suffix, inner_w, max_w, color=color, index=i, max_index=max_index)
     
+    @timed("display_menu")
     def _display_menu(self, max_w, todays_len, todays_tasks, inner_w, future_len, future_tasks, larr, rarr):
-        cls()
-        hl(max_w)
-        center("TODOS:", max_w, color=COLOR_BOLD + COLOR_BRIGHT_MAGENTA + COLOR_UNDERLINE)
-        hl(max_w)
-        if todays_len > 0 or self._selected_date is not None:
-            if self._selected_date is not None:
-                center(f"Date: {self._selected_date.strftime('%Y-%m-%d')}", max_w, color=COLOR_CYAN)
-            else:
-                center("Today:", max_w, color=COLOR_CYAN)
-            if todays_len > 0:
-                self._display_list_part(todays_tasks, max_w, inner_w, larr, rarr, max_index=todays_len + future_len - 1)
-            elif self._selected_date is not None:
-                center("No tasks for this date.", max_w, color=COLOR_BRIGHT_BLACK)
+        with Frame():
+            cls()
             hl(max_w)
-        if future_len > 0:
-            center("Upcoming:", max_w, color=COLOR_CYAN)
-            self._display_list_part(future_tasks, max_w, inner_w, larr, rarr, offset=todays_len, max_index=todays_len + future_len - 1)
+            center("TODOS:", max_w, color=COLOR_BOLD + COLOR_BRIGHT_MAGENTA + COLOR_UNDERLINE)
             hl(max_w)
-        self._print_help_min(max_w)
+            if todays_len > 0 or self._selected_date is not None:
+                if self._selected_date is not None:
+                    center(f"Date: {self._selected_date.strftime('%Y-%m-%d')}", max_w, color=COLOR_CYAN)
+                else:
+                    center("Today:", max_w, color=COLOR_CYAN)
+                if todays_len > 0:
+                    self._display_list_part(todays_tasks, max_w, inner_w, larr, rarr, max_index=todays_len + future_len - 1)
+                elif self._selected_date is not None:
+                    center("No tasks for this date.", max_w, color=COLOR_BRIGHT_BLACK)
+                hl(max_w)
+            if future_len > 0:
+                center("Upcoming:", max_w, color=COLOR_CYAN)
+                self._display_list_part(future_tasks, max_w, inner_w, larr, rarr, offset=todays_len, max_index=todays_len + future_len - 1)
+                hl(max_w)
+            self._print_help_min(max_w)
     
-    def _print_alert(self, msg: str, max_w: int = HL_SIZE, color: str = COLOR_BRIGHT_RED, delay: float = 0.5):
+    def _print_alert(self, msg: str, max_w: int = HL_SIZE, color: str = COLOR_BRIGHT_RED):
         hl(max_w)
         print(" " + colorize(msg, color))
-        time.sleep(delay)
 
-    def _main_menu(self) -> bool:
-        max_w, todays_len, todays_tasks, inner_w, future_len, future_tasks, larr, rarr, all_tasks = self._menu_calculations()
-        
-        self._display_menu(max_w, todays_len, todays_tasks, inner_w, future_len, future_tasks, larr, rarr)
+    def _alert(self, msg: str, color: str = COLOR_BRIGHT_RED, seconds: float = ALERT_SECONDS):
+        """Show msg under the menu; a redraw scheduled after seconds takes it away again."""
+        alert = [msg, color]
+        self._alerts.append(alert)
+        if self._loop is not None:
+            self._loop.call_later(seconds, self._expire_alert, alert)
+
+    def _expire_alert(self, alert: list):
+        if alert in self._alerts:
+            self._alerts.remove(alert)
+            self._redraw()
+
+    def _redraw(self):
+        """Draw the main menu again under a waiting prompt, e.g. after a timer or a reload."""
+        if self._prompt is None:
+            return
+        self._draw_frame()
+        reprint_prompt(self._prompt)
+
+    def _selected_task(self) -> ToDo|None:
+        if self._menu_cache is not None and self._selected_task_index < len(self._menu_cache[3]):
+            return self._menu_cache[3][self._selected_task_index]
+        return None
+
+    def _reselect(self, task: ToDo|None):
+        all_tasks = self._menu_tasks()[2]
+        if task in self._task_positions:
+            self._selected_task_index = self._task_positions[task]
+        else:
+            self._selected_task_index = min(self._selected_task_index, max(len(all_tasks) - 1, 0))
 
-        cmds, cmd = self._menu_input()
+    @timed("reload")
+    def _reload_changes(self):
+        """Merge in what other sessions saved, keeping the selected task selected."""
+        selected = self._selected_task()
+        try:
+            if self.todo_list.reload_if_changed(self.filename):
+                self._reselect(selected)
+        except Exception as e:
+            self._alert(f"Reloading failed: {e}")
+
+    async def _watch(self):
+        """Pick up saves of other sessions and failed saves while the prompt waits."""
+        import asyncio
+        while True:
+            await asyncio.sleep(WATCH_INTERVAL)
+            if self._prompt is None:
+                continue
+            changed = False
+            if self.todo_list.changed_on_disk(self.filename):
+                selected = self._selected_task()
+                try:
+                    changed = await asyncio.to_thread(self.todo_list.reload_if_changed, self.filename)
+                except Exception as e:
+                    self._alert(f"Reloading failed: {e}")
+                    changed = True
+                if changed:
+                    self._reselect(selected)
+            if self._collect_alerts() or changed:
+                self._redraw()
+
+    def _collect_alerts(self) -> bool:
+        """Turn failed saves, merges and queued notices into alerts. Returns True if there were any."""
+        count = len(self._alerts)
+        save_error = self.saver.pop_error()
+        if save_error is not None:
+            self._alert(f"Saving failed: {save_error}")
+        merged, conflicts = self.todo_list.pop_merge_stats()
+        if merged > 0:
+            self._alert(f"Merged {merged} tasks changed by another session", COLOR_BRIGHT_GREEN)
+        if conflicts > 0:
+            self._alert(f"Kept your version of {conflicts} tasks that were also changed elsewhere", COLOR_BRIGHT_YELLOW)
+        for text, color in pop_notices():
+            self._alert(text, color)
+        return len(self._alerts) > count
+
+    def _draw_frame(self):
+        with PROFILER.phase("frame"):
+            self._reload_changes()
+            max_w, todays_len, todays_tasks, inner_w, future_len, future_tasks, larr, rarr, all_tasks = self._menu_calculations()
+            
+            self._display_menu(max_w, todays_len, todays_tasks, inner_w, future_len, future_tasks, larr, rarr)
+        if PROFILER.enabled:
+            print(" " + colorize(PROFILER.status_line(["frame", "reload", "menu_calculations", "display_menu", "terminal_write", "save"]), COLOR_BRIGHT_BLACK))
+        self._collect_alerts()
+        for msg, color in self._alerts:
+            self._print_alert(msg, max_w, color)
+        return max_w, all_tasks
+
+    async def _main_menu(self) -> bool:
+        if self._first_frame is not None:
+            max_w, all_tasks = self._first_frame
+            self._first_frame = None
+        else:
+            max_w, all_tasks = self._draw_frame()
+
+        cmds, cmd = await self._menu_input()
 
         if cmds == "+":
             new_task_title = self._new_task_title(cmd)
             new_task = ToDo(title=new_task_title)
-            self._edit_task(new_task)
+            await run_blocking(self._edit_task, new_task)
             self.todo_list.add_task(new_task)
-            self.todo_list.save(self.filename)
+            self._save()
 
         elif cmds == "-":
             tasks = self._find_tasks(cmd, all_tasks)
-            if self._confirm_deletion(tasks):
-                for task in tasks:
-                    self.todo_list.remove_task(task)
-                self.todo_list.save(self.filename)
+            if await run_blocking(self._confirm_deletion, tasks):
+                self.todo_list.remove_tasks(tasks)
+                self._save()
 
         elif cmds == "d":
             task = self._find_task(cmd, all_tasks)
             cls()
             task.print_full()
-            input("Press Enter to return to the main menu...")
+            await ainput("Press Enter to return to the main menu...")
 
         elif cmds == "e":
             task = self._find_task(cmd, all_tasks)
-            self._edit_task(task)
-            self.todo_list.save(self.filename)
+            await run_blocking(self._edit_task, task)
+            self._save()
 
         elif cmds == "g":
             argstr = cmd[1:].strip()
             if argstr.isnumeric():
                 aindex = int(argstr)
                 if aindex < 0 or aindex >= len(all_tasks):
-                    self._print_alert(f"Index out of range! (Max: {len(all_tasks) - 1})", max_w)
+                    self._alert(f"Index out of range! (Max: {len(all_tasks) - 1})")
                 else:
                     self._selected_task_index = aindex
             else:
                 task = self._find_task(cmd, all_tasks, allow_none=True)
                 if task is not None:
-                    self._selected_task_index = all_tasks.index(task)
+                    self._selected_task_index = self._task_positions[task]
                 else:
-                    self._print_alert("Task not found!", max_w)
+                    self._alert("Task not found!")
 
         elif cmds == "q" or cmd == CTRL_X_INPUT or cmd == "b":
             self._print_alert("Exiting the application...\n", max_w, COLOR_WHITE)
             return False
         
         elif cmds == "?":
-            self._print_help_full()
+            await run_blocking(self._print_help_full)
         
         elif cmds == "t" and len(cmd) > 1:
             found_tasks = self._find_tasks(cmd, all_tasks)
             if len(found_tasks) > 0:
-                for task in found_tasks:
-                    task.toggle()
-                self.todo_list.save(self.filename)
+                self.todo_list.toggle_tasks(found_tasks)
+                self._save()
         
         elif cmds == "/" and len(cmd) > 1:
-            self._adv_menu(cmd, max_w)
+            await self._adv_menu(cmd)
 
         else:
             for c in cmd.lower():
@@ -399,27 +527,39 @@ class ToDoApp:
                     self.previous_task(all_tasks)
                 elif c == "n":
                     self.next_task(all_tasks)
+                elif c == "<":
+                    self.previous_page(all_tasks)
+                elif c == ">":
+                    self.next_page(all_tasks)
                 elif c == "t":
                     all_tasks[self._selected_task_index].toggle()
-                    self.todo_list.save(self.filename)
+                    self._save()
 
         return True
     
-    def _adv_menu(self, cmd, max_w=HL_SIZE):
+    async def _adv_menu(self, cmd):
         acmd = cmd[1:].strip().lower()
         if acmd == "default" or acmd == "def" or acmd == "d":
             self._selected_date = None
             self._selected_task_index = 0
         
         elif acmd == "cal" or acmd == "calendar" or acmd == "c":
-            cv = CalendarView(self.todo_list, self._selected_date)
-            cv.run()
+            from calendar_view import CalendarView
+            cv = CalendarView(self.todo_list, self._selected_date, self.archive)
+            await cv.run_async()
             if cv.show_list:
                 self._selected_date = cv.current_date
                 self._selected_task_index = 0
         
+        elif acmd == "arc" or acmd == "archive":
+            from archive_view import ArchiveView
+            av = ArchiveView(self.todo_list, self.archive)
+            await run_blocking(av.run)
+            if av.restored > 0:
+                self._save()
+
         elif acmd == "?" or acmd == "h" or acmd == "help":
-            self._print_help_full()
+            await run_blocking(self._print_help_full)
         
         elif acmd == "aon" or acmd == "asciion":
             turn_on_ascii()
@@ -438,9 +578,45 @@ class ToDoApp:
                 self._selected_date = datetime.strptime(acmd, "%Y-%m-%d")
                 self._selected_task_index = 0
             except ValueError:
-                self._print_alert(f"Invalid date: {acmd}", max_w)
+                self._alert(f"Invalid date: {acmd}")
+
+    def _archive_old_tasks(self):
+        if self.archive_after is None:
+            return
+        count = archive_done_tasks(self.todo_list, self.archive, timedelta(days=self.archive_after))
+        if count > 0:
+            self._save()
+            self._alert(f"Archived {count} tasks completed more than {self.archive_after} days ago (see /archive)", COLOR_BRIGHT_GREEN)
 
     def run(self, start_commands: list[str] = []):
         self._start_commands = start_commands
-        while self._main_menu():
-            pass
\ No newline at end of file
+        use_piped_stdin()
+        self._archive_old_tasks()
+        # asyncio is the slowest import of the app, so the list is shown before it loads
+        self._first_frame = self._draw_frame()
+        import asyncio
+        asyncio.run(self.run_async())
+
+    async def run_async(self):
+        """The main loop. Input is read on a thread, so meanwhile alerts expire,
+        saves of other sessions show up and the search index gets built."""
+        import asyncio
+        self._loop = asyncio.get_running_loop()
+        for alert in self._alerts:
+            self._loop.call_later(ALERT_SECONDS, self._expire_alert, alert)
+        watcher = asyncio.create_task(self._watch())
+        indexer = asyncio.create_task(asyncio.to_thread(self.todo_list.build_search_index))
+        try:
+            while await self._main_menu():
+                pass
+        finally:
+            watcher.cancel()
+            self._loop = None
+            try:
+                await indexer
+            finally:
+                # also on Ctrl-C, the atexit handler is only the last resort
+                if not self.saver.close():
+                    print(f"The last save did not finish within {SAVE_CLOSE_TIMEOUT:.0f} seconds, recent changes may be lost.", file=sys.stderr)
+        if self.todo_list.journaled:
+            self.todo_list.compact(self.filename)
\ No newline at end of file
@@ -1,96 +1,816 @@
-from datetime import datetime
+from contextlib import contextmanager
+from datetime import date, datetime
+from bisect import bisect_left, bisect_right, insort
+import heapq
 import os
-import yaml
-from yaml.resolver import BaseResolver
-import getpass
+import threading
 
 from consts import *
 from todo import *
+from journal import ChangeJournal, encode_record, decode_value
+from save_scheduler import atomic_open
+from file_lock import FileLock, lock_path
+from search_index import SearchIndex
+from profiler import timed
+from shards import UNDATED_SHARD, month_key, shard_key, shard_range
+from storage import Storage, open_storage
 
 
-def represent_literal(dumper, data):
-  return dumper.represent_scalar(BaseResolver.DEFAULT_SCALAR_TAG,
-      data, style="|")
-yaml.add_representer(AsLiteral, represent_literal)
+def current_user() -> str:
+    import getpass
+    return getpass.getuser()
+
+
+def iter_yaml_tasks(f):
+    import yaml_io
+    return yaml_io.iter_yaml_tasks(f)
+
+
+def write_yaml_tasks(f, tasks, created_by: str|None = None, created_date: datetime|None = None):
+    import yaml_io
+    yaml_io.write_yaml_tasks(f, tasks, created_by, created_date)
+
+
+def convert_file(source: str, target: str):
+    """Convert a todo file between YAML and Markdown, one task at a time.
+
+    The format of each side is chosen by its file extension. A YAML source
+    with a pending change journal is loaded completely so the journal is
+    applied first, and so are sharded lists and SQLite databases on
+    either side.
+    """
+    src = open_storage(source)
+    dst = open_storage(target)
+    if not src.can_stream() or not dst.can_stream():
+        todo_list = ToDoList()
+        todo_list.load(source)
+        todo_list.load_all()
+        todo_list.save(target)
+        return
+    with atomic_open(target) as f:
+        dst.write_tasks(f, src.read_tasks())
+
+
+def _seq_key(task: ToDo) -> int:
+    return task._seq
+
+
+_FINGERPRINT_FIELDS = ("title", "state", "description", "created_at", "planned_at")
+
+
+def _fingerprint(task: ToDo, field: str|None = None, old=None) -> tuple:
+    """The fields a merge compares, optionally with field set back to its old value."""
+    values = [task._title, task._done is not False, task._description_text(), task._created_at, task._planned_at]
+    if field in _FINGERPRINT_FIELDS:
+        if field == "description" and type(old) is LazyText:
+            old = old.text()
+        elif field == "created_at" or field == "planned_at":
+            old = pack_time(old)
+        values[_FINGERPRINT_FIELDS.index(field)] = old
+    return tuple(values)
+
+
+def _same_task(a: ToDo, b: ToDo) -> bool:
+    if (a._title != b._title or a._done != b._done or a._created_at != b._created_at
+            or a._planned_at != b._planned_at):
+        return False
+    da = a._description
+    db = b._description
+    if type(da) is LazyText and type(db) is LazyText and da.raw == db.raw and da.indent == db.indent and da.chomp == db.chomp:
+        return True
+    return a._description_text() == b._description_text()
+
+
+_UPDATABLE_FIELDS = ("title", "state", "description", "created_at", "planned_at", "completed_at")
+
+
+def _task_slots(task: ToDo) -> tuple:
+    return (task._done, task._title, task._description, task._created_at, task._planned_at)
+
+
+class _UndoLog:
+    """What changed since a ToDoList.batch() started, to undo it if the batch fails."""
+
+    def __init__(self, todo_list: 'ToDoList'):
+        self.pending = len(todo_list._pending)
+        self.local_changes = dict(todo_list._local_changes)
+        self.dirty_shards = set(todo_list._store.dirty) if todo_list._store is not None else None
+        self.added = {} # task id -> task added in the batch
+        self.removed = [] # (task, _seq) of tasks that were in the list before the batch
+        self.touched = {} # task id -> (task, _task_slots() before its first change)
+        self.saves = [] # (method, filename) called during the batch, run when it ends
 
 
 class ToDoList():
 
-    tasks:list[ToDo]
     creation_date:datetime
     created_by:str
+    revision:int
+    journaled:bool
+    journal_limit:int
+    search_descriptions:bool
+    lazy_details:bool
+    use_snapshot_cache:bool
 
     def __init__(self):
-        self.tasks = []
         self.creation_date = datetime.now()
-        self.created_by = getpass.getuser()
+        self.created_by = current_user()
+        self.revision = 0
+        self.journaled = False
+        self.journal_limit = JOURNAL_COMPACT_SIZE
+        self.search_descriptions = False
+        self.lazy_details = True
+        self.use_snapshot_cache = True
+        self._pending = []
+        self._loading = False
+        self._needs_snapshot = False
+        self._synced_file = None # the file the list was last loaded from or saved to
+        self._store = None # the Storage of that file
+        self._disk_stamp = None # its stamps() as of then
+        self._merge_stats = [0, 0] # tasks taken from disk, conflicting local edits kept
+        self.lock = threading.RLock() # guards the in-memory state against the background saver
+        self._save_lock = threading.RLock() # serializes writes to the files, held by batch() until it ends
+        self._batch = None # the _UndoLog of the open batch()
+        # tasks in the list are switched to this class, which is where their _owner is kept
+        self._task_class = type("ListedToDo", (ToDo,), {"__slots__": (), "_owner": self})
+        self._clear_index()
+
+    def _clear_index(self):
+        self.revision += 1
+        self._partition = None
+        self._search = None # built on the first search, then kept up to date
+        self._next_seq = 0
+        self._tasks = {} # packed task id (pack_id) -> task, in list order
+        self._by_day = {} # day ordinal -> tasks planned for that day, ordered like self.tasks
+        self._days = [] # sorted day ordinals that have at least one task
+        self._undated = {} # task id -> task without a planned date
+        self._month_stats = {} # (year, month) -> {day ordinal: (task count, done count)}
+        self._local_changes = {} # task id -> _fingerprint() of the task on disk (None if it is not), for tasks changed since the last save
+
+    def _invalidate_month(self, day: int|None):
+        if day is None or len(self._month_stats) <= 0:
+            return
+        d = date.fromordinal(day)
+        self._month_stats.pop((d.year, d.month), None)
+
+    def _index_add(self, task: ToDo):
+        day = task.planned_day()
+        if day is None:
+            self._undated[task._id] = task
+            return
+        self._invalidate_month(day)
+        bucket = self._by_day.get(day)
+        if bucket is None:
+            self._by_day[day] = [task]
+            insort(self._days, day)
+        elif bucket[-1]._seq < task._seq:
+            # new and loaded tasks always come last
+            bucket.append(task)
+        else:
+            bucket.insert(bisect_right(bucket, task._seq, key=_seq_key), task)
+
+    def _index_remove(self, task: ToDo, day: int|None):
+        if day is None:
+            self._undated.pop(task._id, None)
+            return
+        self._invalidate_month(day)
+        bucket = self._by_day.get(day)
+        if bucket is None:
+            return
+        i = bisect_left(bucket, task._seq, key=_seq_key)
+        if i < len(bucket) and bucket[i] is task:
+            del bucket[i]
+        if len(bucket) <= 0:
+            del self._by_day[day]
+            del self._days[bisect_left(self._days, day)]
+
+    def _mark_dirty(self, day: int|None):
+        if self._store is None or self._loading:
+            return
+        self._store.mark_dirty(self, day)
+
+    def _recording(self) -> bool:
+        return self.journaled and not self._loading
+
+    def _record(self, record: dict):
+        if self._recording():
+            self._pending.append(encode_record(record))
+
+    def _note_local_change(self, task: ToDo, field: str|None = None, old=None, new: bool = False):
+        if self._loading or task._id in self._local_changes:
+            return
+        self._local_changes[task._id] = None if new else _fingerprint(task, field, old)
+
+    def _task_changing(self, task: ToDo):
+        if self._batch is not None and task._id not in self._batch.touched:
+            self._batch.touched[task._id] = (task, _task_slots(task))
+
+    def _task_changed(self, task: ToDo, field: str, old):
+        with self.lock:
+            self.revision += 1
+            self._note_local_change(task, field, old)
+            self._record({"op": "set", "id": task.id, "field": field, "value": getattr(task, field)})
+            self._mark_dirty(task.planned_day())
+            if self._search is not None and (field == "title" or field == "description"):
+                self._search.update(task)
+            if field == "state":
+                self._record({"op": "set", "id": task.id, "field": "completed_at", "value": task.completed_at})
+                self._invalidate_month(task.planned_day())
+            elif field == "planned_at":
+                old_day = old.toordinal() if old is not None else None
+                self._mark_dirty(old_day)
+                if old_day != task.planned_day():
+                    self._index_remove(task, old_day)
+                    self._index_add(task)
     
     def add_task(self, task: ToDo):
         if not isinstance(task, ToDo):
             raise TypeError("task must be an instance of ToDo")
-        self.tasks.append(task)
+        with self.lock:
+            if task._id in self._tasks:
+                raise ValueError(f"A task with id {task.id} is already in the list.")
+            if self._batch is not None:
+                self._batch.added[task._id] = task
+            self._tasks[task._id] = task
+            task.__class__ = self._task_class
+            task._seq = self._next_seq
+            self._next_seq += 1
+            self._index_add(task)
+            if self._search is not None:
+                self._search.add(task)
+            self.revision += 1
+            self._note_local_change(task, new=True)
+            if self._recording():
+                # to_dict() would unpack a lazily loaded description
+                self._record({"op": "add", "id": task.id, "task": task.to_dict()})
+            self._mark_dirty(task.planned_day())
         return task
     
     def remove_task(self, task: ToDo):
-        if not isinstance(task, ToDo):
-            raise TypeError("task must be an instance of ToDo")
-        if task in self.tasks:
-            self.tasks.remove(task)
-            return task
-        raise ValueError("Task not found in the list.")
+        if len(self.remove_tasks([task])) <= 0:
+            raise ValueError("Task not found in the list.")
+        return task
+
+    def remove_tasks(self, tasks) -> list[ToDo]:
+        """Remove several tasks at once and return the ones that were in the list.
+
+        Each day that loses several tasks is filtered once with an identity
+        set, instead of searching its bucket once per removed task.
+        """
+        removed = []
+        with self.lock:
+            for task in tasks:
+                if not isinstance(task, ToDo):
+                    raise TypeError("task must be an instance of ToDo")
+                # also skips a task listed twice, it is gone after the first time
+                if self._tasks.get(task._id) is task:
+                    self._note_local_change(task)
+                    del self._tasks[task._id]
+                    removed.append(task)
+            if len(removed) <= 0:
+                return removed
+            by_day = {}
+            for task in removed:
+                day = task.planned_day()
+                if day is None:
+                    self._undated.pop(task._id, None)
+                else:
+                    by_day.setdefault(day, []).append(task)
+                if self._search is not None:
+                    self._search.remove(task)
+                if self._batch is not None and self._batch.added.pop(task._id, None) is not task:
+                    self._batch.removed.append((task, task._seq))
+                    # it can still be changed after it left the list
+                    self._task_changing(task)
+                task.__class__ = ToDo
+                self._record({"op": "del", "id": task.id})
+                self._mark_dirty(day)
+            for day, day_tasks in by_day.items():
+                if len(day_tasks) == 1:
+                    self._index_remove(day_tasks[0], day)
+                    continue
+                self._invalidate_month(day)
+                gone = set(day_tasks)
+                bucket = [task for task in self._by_day[day] if task not in gone]
+                if len(bucket) > 0:
+                    self._by_day[day] = bucket
+                else:
+                    del self._by_day[day]
+                    del self._days[bisect_left(self._days, day)]
+            self.revision += 1
+        return removed
+
+    def toggle_tasks(self, tasks) -> list[ToDo]:
+        """Toggle each task once, also if it is listed twice. Returns the toggled tasks."""
+        tasks = list(dict.fromkeys(tasks))
+        with self.lock:
+            for task in tasks:
+                task.toggle()
+        return tasks
+
+    def update_tasks(self, tasks, **fields) -> list[ToDo]:
+        """Set the same fields on several tasks, e.g. update_tasks(tasks, planned_at=None).
+
+        Either all tasks get all fields or, if setting one fails, none.
+        """
+        unknown = [name for name in fields if name not in _UPDATABLE_FIELDS]
+        if len(unknown) > 0:
+            raise ValueError(f"Unknown task fields: {', '.join(unknown)}")
+        tasks = list(dict.fromkeys(tasks))
+        with self.batch():
+            for task in tasks:
+                for name, value in fields.items():
+                    setattr(task, name, value)
+        return tasks
+
+    @contextmanager
+    def batch(self):
+        """Make the changes in the block one unit.
+
+        Saves and merges of other threads wait until the block ends, and
+        save() or compact() called inside it run once at the end. If the
+        block raises, every change it made to the list is undone. A batch
+        inside a batch is part of the outer one.
+        """
+        with self._save_lock:
+            if self._batch is not None:
+                yield self
+                return
+            with self.lock:
+                self._batch = _UndoLog(self)
+            try:
+                yield self
+            except BaseException:
+                with self.lock:
+                    log = self._batch
+                    self._batch = None
+                    self._rollback(log)
+                raise
+            with self.lock:
+                saves = self._batch.saves
+                self._batch = None
+            for method, filename in saves:
+                method(filename)
+
+    def _rollback(self, log: _UndoLog):
+        self._loading = True
+        try:
+            self.remove_tasks([task for task in log.added.values() if self._tasks.get(task._id) is task])
+            for task, slots in log.touched.values():
+                in_list = self._tasks.get(task._id) is task
+                old_day = task.planned_day()
+                task._done, task._title, task._description, task._created_at, task._planned_at = slots
+                if not in_list:
+                    continue
+                if old_day != task.planned_day():
+                    self._index_remove(task, old_day)
+                    self._index_add(task)
+                else:
+                    self._invalidate_month(old_day)
+                if self._search is not None:
+                    self._search.update(task)
+            if len(log.removed) > 0:
+                for task, seq in log.removed:
+                    self._tasks[task._id] = task
+                    task.__class__ = self._task_class
+                    task._seq = seq
+                    self._index_add(task)
+                    if self._search is not None:
+                        self._search.add(task)
+                self._tasks = dict(sorted(self._tasks.items(), key=lambda item: item[1]._seq))
+        finally:
+            self._loading = False
+        del self._pending[log.pending:]
+        self._local_changes = log.local_changes
+        if log.dirty_shards is not None:
+            self._store.dirty = log.dirty_shards
+        self.revision += 1
+
+    def _deferred(self, method, filename: str) -> bool:
+        """Put off a save called inside a batch until the batch ends. The caller holds _save_lock."""
+        if self._batch is None:
+            return False
+        if (method, filename) not in self._batch.saves:
+            self._batch.saves.append((method, filename))
+        return True
+
+    @property
+    def tasks(self):
+        """A read-only view of all tasks in list order."""
+        return self._tasks.values()
+
+    def get_task(self, task_id: str) -> ToDo|None:
+        return self._tasks.get(pack_id(task_id))
     
+    @timed("save")
     def save(self, filename: str):
+        """Persist the list.
+
+        In journaled mode only the pending changes are appended to the
+        sidecar journal, until it outgrows journal_limit and is compacted.
+        Changes another process saved since our last load or save are
+        merged in first, all under the file lock. Safe to call from a
+        background thread.
+        """
+        with self._save_lock:
+            if self._deferred(self.save, filename):
+                return
+            self._save(filename)
+
+    def _save(self, filename: str):
+        with FileLock(lock_path(filename)):
+            self._merge_changes(filename)
+            store = self._storage_for(filename)
+            if self.journaled and not self._needs_snapshot and store.journaled and os.path.exists(filename):
+                with self.lock:
+                    taken = self._take_changes()
+                journal = ChangeJournal(filename)
+                try:
+                    journal.append(taken[0])
+                except BaseException:
+                    with self.lock:
+                        self._restore_changes(taken)
+                        # part of the records may be in the journal already, a snapshot replaces both
+                        self._needs_snapshot = True
+                    raise
+                if journal.size() > self.journal_limit:
+                    store.write(self)
+            else:
+                store.write(self)
+            self._synced(store)
+
+    @timed("save")
+    def compact(self, filename: str):
+        """Write a full snapshot and fold the journal into it."""
+        with self._save_lock:
+            if self._deferred(self.compact, filename):
+                return
+            with FileLock(lock_path(filename)):
+                self._merge_changes(filename)
+                store = self._storage_for(filename)
+                store.write(self)
+                self._synced(store)
+
+    def _take_changes(self) -> tuple[list[str], dict]:
+        """Hand the pending journal records and local changes to a save; the changes are on disk after it."""
+        taken = (self._pending, self._local_changes)
+        self._pending = []
+        self._local_changes = {}
+        return taken
+
+    def _restore_changes(self, taken: tuple[list[str], dict]):
+        """Give back what _take_changes() handed to a save that failed. The caller holds self.lock."""
+        pending, local_changes = taken
+        self._pending[:0] = pending
+        # the fingerprints taken are the ones of the file on disk, newer ones are not
+        self._local_changes.update(local_changes)
+
+    def _storage_for(self, filename: str) -> Storage:
+        if self._store is not None and self._store.filename == filename:
+            return self._store
+        return open_storage(filename)
+
+    def _synced(self, store: Storage):
+        with self.lock:
+            self._store = store
+        self._synced_file = store.filename
+        self._disk_stamp = store.stamps()
+
+    def changed_on_disk(self, filename: str) -> bool:
+        """Whether another process saved the list since our last load or save.
+
+        Only stats the files, so it is cheap enough to call before every frame.
+        """
+        return filename == self._synced_file and self._store.stamps() != self._disk_stamp
+
+    def reload_if_changed(self, filename: str) -> bool:
+        """Merge in what other processes saved. Returns True if the list changed."""
+        if not self.changed_on_disk(filename):
+            return False
+        with self._save_lock:
+            if self._batch is not None:
+                # called inside our own batch, it would be undone with it
+                return False
+            with FileLock(lock_path(filename)):
+                return self._merge_changes(filename)
+
+    def pop_merge_stats(self) -> tuple[int, int]:
+        """(tasks taken from disk, conflicting local edits kept) since the last call."""
+        with self.lock:
+            stats = tuple(self._merge_stats)
+            self._merge_stats = [0, 0]
+        return stats
+
+    def _merge_changes(self, filename: str) -> bool:
+        """Three-way merge of the file into the list. The caller holds the file lock.
+
+        Tasks nobody changed here since the last save take the version on
+        disk, tasks added on disk are added and tasks deleted there are
+        removed. Tasks changed here keep the local version, also when the
+        other process changed them too (counted as conflicts). Markdown
+        files have no task ids, so they are only reloaded as a whole and
+        only while there are no local changes.
+        """
+        if filename != self._synced_file:
+            # a different file is replaced, not merged with
+            return False
+        stamp = self._store.stamps()
+        if stamp == self._disk_stamp:
+            return False
+        if not os.path.exists(filename):
+            # moved away or deleted: the next save writes it again
+            self._disk_stamp = stamp
+            return False
+        if not self._store.has_ids:
+            return self._reload_whole(stamp)
+        other = ToDoList()
+        other.lazy_details = self.lazy_details
+        other._loading = True
+        other._load(open_storage(filename))
+        other._store.catch_up(other, self)
+        other._loading = False
+        disk = other._tasks
+        with self.lock:
+            changed = 0
+            conflicts = 0
+            revived = []
+            self._loading = True
+            try:
+                for task_id, remote in disk.items():
+                    local = self._tasks.get(task_id)
+                    if task_id in self._local_changes:
+                        remote_fp = _fingerprint(remote)
+                        if remote_fp != self._local_changes[task_id] and (local is None or remote_fp != _fingerprint(local)):
+                            conflicts += 1
+                        self._local_changes[task_id] = remote_fp
+                    elif local is None:
+                        self.add_task(remote)
+                        changed += 1
+                    elif not _same_task(local, remote):
+                        self._take_fields(local, remote)
+                        changed += 1
+                for task in list(self._tasks.values()):
+                    if task._id in disk:
+                        continue
+                    if task._id not in self._local_changes:
+                        self.remove_task(task)
+                        changed += 1
+                    elif self._local_changes[task._id] is not None:
+                        # changed here, deleted there: keep it, but the journal must add it again
+                        conflicts += 1
+                        self._local_changes[task._id] = None
+                        revived.append(task)
+            finally:
+                self._loading = False
+            for task in revived:
+                self._record({"op": "add", "id": task.id, "task": task.to_dict()})
+            self._store.take_months(other._store)
+            self._merge_stats[0] += changed
+            self._merge_stats[1] += conflicts
+            self._disk_stamp = stamp
+        return changed > 0
+
+    def _reload_whole(self, stamp: tuple) -> bool:
+        with self.lock:
+            if len(self._local_changes) > 0:
+                # ours wins; the next save overwrites the file
+                self._merge_stats[1] += len(self._local_changes)
+                self._disk_stamp = stamp
+                return False
+            self._loading = True
+            try:
+                self._load(self._store)
+            finally:
+                self._loading = False
+            self._merge_stats[0] += len(self._tasks)
+            self._disk_stamp = stamp
+        return True
+
+    def _take_fields(self, task: ToDo, other: ToDo):
+        """Copy other's fields into task without recording them as local changes."""
+        old_day = task.planned_day()
+        task._done = other._done
+        task._title = other._title
+        task._description = other._description
+        task._created_at = other._created_at
+        task._planned_at = other._planned_at
+        if old_day != task.planned_day():
+            self._index_remove(task, old_day)
+            self._index_add(task)
+        else:
+            self._invalidate_month(old_day)
+        if self._search is not None:
+            self._search.update(task)
+        self.revision += 1
+
+    def _shard_tasks(self, key: str) -> list[ToDo]:
+        if key == UNDATED_SHARD:
+            return sorted(self._undated.values(), key=_seq_key)
+        first, end = shard_range(key)
+        days = self._days[bisect_left(self._days, first):bisect_left(self._days, end)]
+        return list(heapq.merge(*(self._by_day[day] for day in days), key=_seq_key))
+
+    def _snapshot_data(self, with_tasks: bool = True) -> dict:
         data = {
             "ToDos": {
                 "created_by": self.created_by,
-                "changed_by": getpass.getuser(),
+                "changed_by": current_user(),
                 "created_date": self.creation_date,
                 "changed_date": datetime.now(),
-                "tasks": {}
             }
         }
-        for task in self.tasks:
-            data["ToDos"]["tasks"][task.title] = task.to_dict()
+        if with_tasks:
+            data["ToDos"]["tasks"] = {task.id: task.to_dict() for task in self._tasks.values()}
+        return data
 
-        # Convert OrderedDict to a standard dict before dumping to YAML
-        with open(filename, "w+", encoding="utf-8") as f:
-            yaml.dump(data, f, default_flow_style=False, sort_keys=False)
+    def _replay(self, journal: ChangeJournal):
+        for record in journal.read():
+            op = record.get("op")
+            if op == "add":
+                task_dict = {key: decode_value(key, value) for key, value in record["task"].items()}
+                self.add_task(ToDo.From_dict(record["id"], task_dict))
+                continue
+            task = self._tasks.get(pack_id(record.get("id", "")))
+            if task is None:
+                continue
+            if op == "del":
+                self.remove_task(task)
+            elif op == "set":
+                setattr(task, record["field"], decode_value(record["field"], record["value"]))
+        if journal.torn:
+            # the next save rewrites the file and starts a clean journal
+            self._needs_snapshot = True
 
+    @timed("load")
     def load(self, filename: str):
-        if os.path.exists(filename):
-            self.tasks = []
-            with open(filename, "r", encoding="utf-8") as f:
-                data = yaml.safe_load(f)
-
-                if data and "ToDos" in data and "tasks" in data["ToDos"]:
-                    if "created_date" in data["ToDos"]:
-                        self.creation_date = data["ToDos"]["created_date"]
-
-                    if "created_by" in data["ToDos"]:
-                        self.created_by = data["ToDos"]["created_by"]
-
-                    task_dict = data["ToDos"]["tasks"]
-                    for title, task_data in task_dict.items():
-                        task = ToDo.From_dict(title, task_data)
-                        self.add_task(task)
-                else:
-                    raise ValueError(f"File {filename} is not in the expected YAML format")
+        store = open_storage(filename)
+        if not os.path.exists(filename):
+            self._synced(store)
+            return
+        with FileLock(lock_path(filename)), self.lock:
+            self._loading = True
+            try:
+                self._load(store)
+            finally:
+                self._loading = False
+            self._pending = []
+            self._synced(store)
+
+    def _load(self, store: Storage):
+        self._clear_index()
+        self._needs_snapshot = False
+        self._store = store
+        store.load(self)
+
+    def _add_loaded_tasks(self, data, filename: str):
+        if data and "ToDos" in data and "tasks" in data["ToDos"]:
+            if "created_date" in data["ToDos"]:
+                self.creation_date = data["ToDos"]["created_date"]
+
+            if "created_by" in data["ToDos"]:
+                self.created_by = data["ToDos"]["created_by"]
+
+            task_dict = data["ToDos"]["tasks"] or {}
+            for key, task_data in task_dict.items():
+                if "title" not in task_data:
+                    # Migrated tasks get new ids, which only a full rewrite persists.
+                    self._needs_snapshot = True
+                task = ToDo.From_dict(key, task_data)
+                self.add_task(task)
+        else:
+            raise ValueError(f"File {filename} is not in the expected YAML format")
+
+    def _add_stored_tasks(self, tasks: list[ToDo]):
+        for task in tasks:
+            # open tasks of older months are loaded before the rest of their month
+            if task._id not in self._tasks:
+                self.add_task(task)
+
+    def _ensure_shard(self, key: str):
+        store = self._store
+        if store is None or store.is_loaded(key):
+            return
+        with self.lock:
+            if store.is_loaded(key):
+                return
+            loading = self._loading
+            self._loading = True
+            try:
+                store.load_month(self, key)
+            finally:
+                self._loading = loading
+
+    def is_month_loaded(self, year: int, month: int) -> bool:
+        return self._store is None or self._store.is_loaded(month_key(year, month))
+
+    def load_all(self):
+        """Load the shards or months that are not loaded yet (nothing to do for single files)."""
+        if self._store is None:
+            return
+        for key in self._store.month_keys():
+            self._ensure_shard(key)
     
     def get_todays_tasks(self):
-        today = datetime.now().date()
-        return [task for task in self.tasks if task.planned_at and task.planned_at.date() <= today]
+        today = datetime.now().toordinal()
+        # a save merging on the background thread changes the buckets
+        with self.lock:
+            buckets = [self._by_day[day] for day in self._days[:bisect_right(self._days, today)]]
+            if len(buckets) == 1:
+                return list(buckets[0])
+            return list(heapq.merge(*buckets, key=_seq_key))
     
     def get_upcoming_tasks(self):
-        todays_tasks = self.get_todays_tasks()
-        return [task for task in self.tasks if task not in todays_tasks]
+        return list(self.partition_tasks()[1])
+
+    def partition_tasks(self) -> tuple[list[ToDo], list[ToDo]]:
+        """Split the tasks into (due today or earlier, upcoming) in one pass.
+
+        The result is cached until the list is mutated or the day changes,
+        so callers must not modify the returned lists.
+        """
+        today = datetime.now().toordinal()
+        # under the lock, so a merge of a background save can neither change
+        # the tasks while they are split nor slip in before the revision is taken
+        with self.lock:
+            cached = self._partition
+            if cached is not None and cached[0] == self.revision and cached[1] == today:
+                return cached[2], cached[3]
+            todays_tasks = []
+            upcoming_tasks = []
+            for task in self._tasks.values():
+                day = task.planned_day()
+                if day is not None and day <= today:
+                    todays_tasks.append(task)
+                else:
+                    upcoming_tasks.append(task)
+            self._partition = (self.revision, today, todays_tasks, upcoming_tasks)
+            return todays_tasks, upcoming_tasks
     
     def get_tasks_for_date(self, date: datetime) -> list[ToDo]:
-        return [task for task in self.tasks if task.planned_at and task.planned_at.date() == date.date()]
+        self._ensure_shard(shard_key(date.toordinal()))
+        with self.lock:
+            return list(self._by_day.get(date.toordinal(), ()))
     
-    def find_task(self, search:str, all_tasks:list[ToDo]) -> list[ToDo]:
+    def has_month_stats(self, year: int, month: int) -> bool:
+        """Whether month_stats() of the month is cached."""
+        with self.lock:
+            return (year, month) in self._month_stats
+
+    def month_stats(self, year: int, month: int) -> dict[int, tuple[int, int]]:
+        """Return {day ordinal: (task count, done count)} for the days of a month that have tasks.
+
+        Cached per month until a task of that month changes. For sharded
+        lists this loads the month's shard.
+        """
+        self._ensure_shard(month_key(year, month))
+        with self.lock:
+            stats = self._month_stats.get((year, month))
+            if stats is not None:
+                return stats
+            first = date(year, month, 1).toordinal()
+            end = date(year + month // 12, month % 12 + 1, 1).toordinal()
+            stats = {}
+            for day in self._days[bisect_left(self._days, first):bisect_left(self._days, end)]:
+                bucket = self._by_day[day]
+                stats[day] = (len(bucket), sum(1 for task in bucket if task.state))
+            self._month_stats[(year, month)] = stats
+            return stats
+
+    def build_search_index(self):
+        """Build the index find_task uses, unless it is up to date. Safe to call from a background thread."""
+        with self.lock:
+            if self._search is None or self._search.include_descriptions != self.search_descriptions:
+                search = SearchIndex(self.search_descriptions)
+                for task in self._tasks.values():
+                    search.add(task)
+                self._search = search
+
+    def find_task(self, search:str, all_tasks:list[ToDo]|None = None) -> list[ToDo]:
+        """Return the tasks whose title contains search, ignoring case.
+
+        Without all_tasks the whole list is searched through the search
+        index and the result is in list order.
+        """
         search = search.lower().strip()
-        found_tasks = []
-        for task in all_tasks:
-            if search in task.title.lower():
-                found_tasks.append(task)
+        if all_tasks is not None:
+            found_tasks = []
+            for task in all_tasks:
+                if search in task.title.lower():
+                    found_tasks.append(task)
+            return found_tasks
+        if self._store is not None and not self.search_descriptions:
+            # the storage only finds titles, in the months that are not loaded
+            with self.lock:
+                missing = [task_id for task_id in self._store.find_ids(search) if task_id not in self._tasks]
+                if len(missing) > 0:
+                    loading = self._loading
+                    self._loading = True
+                    try:
+                        self._store.load_tasks(self, missing)
+                    finally:
+                        self._loading = loading
+        with self.lock:
+            self.build_search_index()
+            found_tasks = [self._tasks[task_id] for task_id in self._search.search(search)]
+        found_tasks.sort(key=_seq_key)
         return found_tasks
\ No newline at end of file
@@ -0,0 +1,213 @@
+"""YAML reading and writing for ToDoList.
+
+Importing PyYAML takes a noticeable part of the startup time, so
+todolist only imports this module when it reads or writes a YAML file.
+"""
+from datetime import datetime
+import getpass
+import re
+import yaml
+from yaml.composer import Composer
+from yaml.constructor import SafeConstructor
+from yaml.events import MappingEndEvent, MappingStartEvent
+from yaml.resolver import BaseResolver, Resolver
+
+from todo import AsLiteral, LazyText, ToDo
+
+
+# Prefer the libyaml bindings when PyYAML was built with them.
+try:
+    from yaml import CSafeLoader as YamlLoader, CDumper as YamlDumper
+    from yaml._yaml import CParser as YamlParser
+except ImportError:
+    from yaml import SafeLoader as YamlLoader, Dumper as YamlDumper
+    from yaml.reader import Reader
+    from yaml.scanner import Scanner
+    from yaml.parser import Parser
+    class YamlParser(Reader, Scanner, Parser):
+        def __init__(self, stream):
+            Reader.__init__(self, stream)
+            Scanner.__init__(self)
+            Parser.__init__(self)
+
+# Both emitters only agree byte for byte when they never fold lines and
+# never fall back to escaped quoting for non-ASCII text.
+YAML_DUMP_OPTIONS = {
+    "default_flow_style": False,
+    "sort_keys": False,
+    "allow_unicode": True,
+    "width": 2 ** 31 - 1,
+}
+
+
+def represent_literal(dumper, data):
+  # The libyaml emitter only accepts exact str instances, not subclasses.
+  return dumper.represent_scalar(BaseResolver.DEFAULT_SCALAR_TAG,
+      str(data), style="|")
+yaml.add_representer(AsLiteral, represent_literal)
+yaml.add_representer(AsLiteral, represent_literal, Dumper=YamlDumper)
+
+
+class _LazyDetailsLoader(YamlLoader):
+    lazy_blocks:list[LazyText] = []
+
+
+def _construct_lazy(loader, node):
+    return loader.lazy_blocks[int(node.value)]
+_LazyDetailsLoader.add_constructor("!lazy", _construct_lazy)
+
+
+_BLOCK_HEADER_RE = re.compile(r"^( *)([^\s:][^\n:]*): ([|>])([1-9]?)([-+]?)([1-9]?)[ \t]*\n", re.MULTILINE)
+_INDENT_RE = re.compile(r"^( *)\S", re.MULTILINE)
+_BLOCK_END_RES = {}
+
+
+def _block_end(text: str, start: int, indent: int) -> int:
+    # the first non-blank line indented less than the block ends it
+    end_re = _BLOCK_END_RES.get(indent)
+    if end_re is None:
+        end_re = re.compile(r"\n {0,%i}[^ \n]" % (indent - 1))
+        _BLOCK_END_RES[indent] = end_re
+    end = end_re.search(text, start - 1)
+    return end.start() + 1 if end is not None else len(text)
+
+
+def _cut_detail_blocks(text: str) -> tuple[str, list[LazyText]]:
+    """Replace `details: |` block scalars with !lazy placeholders.
+
+    The parser then skips over the descriptions entirely and they are kept
+    as raw text until something reads them.
+    """
+    parts = []
+    blocks = []
+    pos = 0
+    search_from = 0
+    while True:
+        match = _BLOCK_HEADER_RE.search(text, search_from)
+        if match is None:
+            break
+        search_from = match.end()
+        key_indent = len(match.group(1))
+        explicit = match.group(4) or match.group(6)
+        if explicit:
+            indent = key_indent + int(explicit)
+        else:
+            first = _INDENT_RE.search(text, match.end())
+            indent = len(first.group(1)) if first is not None else 0
+        if indent <= key_indent:
+            continue
+        end = _block_end(text, match.end(), indent)
+        if match.group(2) == "details" and match.group(3) == "|":
+            parts.append(text[pos:match.start()])
+            parts.append(f"{match.group(1)}details: !lazy {len(blocks)}\n")
+            blocks.append(LazyText(text[match.end():end], indent, match.group(5)))
+        else:
+            parts.append(text[pos:end])
+        pos = end
+        search_from = end
+    if len(blocks) <= 0:
+        return text, blocks
+    parts.append(text[pos:])
+    return "".join(parts), blocks
+
+
+class _StreamLoader(YamlParser, Composer, SafeConstructor, Resolver):
+    """A safe loader that can build one node at a time instead of the whole document."""
+
+    def __init__(self, stream):
+        YamlParser.__init__(self, stream)
+        Composer.__init__(self)
+        SafeConstructor.__init__(self)
+        Resolver.__init__(self)
+
+    def next_value(self):
+        node = self.compose_node(None, None)
+        value = self.construct_document(node)
+        self.anchors = {}
+        return value
+
+
+def iter_yaml_tasks(f):
+    """Yield the tasks of a YAML todo file one at a time, without loading the whole file."""
+    loader = _StreamLoader(f)
+    try:
+        loader.get_event() # stream start
+        loader.get_event() # document start
+        if not loader.check_event(MappingStartEvent):
+            raise ValueError("File is not in the expected YAML format")
+        loader.get_event()
+        found = False
+        while not loader.check_event(MappingEndEvent):
+            key = loader.next_value()
+            if key != "ToDos" or not loader.check_event(MappingStartEvent):
+                loader.next_value()
+                continue
+            loader.get_event()
+            while not loader.check_event(MappingEndEvent):
+                key = loader.next_value()
+                if key != "tasks":
+                    loader.next_value()
+                    continue
+                found = True
+                if not loader.check_event(MappingStartEvent):
+                    loader.next_value() # an empty list
+                    continue
+                loader.get_event()
+                while not loader.check_event(MappingEndEvent):
+                    task_key = loader.next_value()
+                    yield ToDo.From_dict(task_key, loader.next_value())
+                loader.get_event()
+            loader.get_event()
+        if not found:
+            raise ValueError("File is not in the expected YAML format")
+    finally:
+        loader.dispose()
+
+
+def write_yaml_tasks(f, tasks, created_by: str|None = None, created_date: datetime|None = None):
+    """Write tasks (any iterable, consumed lazily) in the format of ToDoList.save."""
+    header = {
+        "created_by": created_by or getpass.getuser(),
+        "changed_by": getpass.getuser(),
+        "created_date": created_date or datetime.now(),
+        "changed_date": datetime.now(),
+    }
+    f.write("ToDos:\n")
+    for line in yaml.dump(header, Dumper=YamlDumper, **YAML_DUMP_OPTIONS).splitlines(True):
+        f.write("  " + line)
+    f.write("  tasks:")
+    empty = True
+    for task in tasks:
+        if empty:
+            f.write("\n")
+            empty = False
+        text = yaml.dump({task.id: task.to_dict()}, Dumper=YamlDumper, **YAML_DUMP_OPTIONS)
+        if text.endswith("\n...\n"):
+            # a document end marker after a keep (|+) block, not needed mid-document
+            text = text[:-4]
+        for line in text.splitlines(True):
+            f.write("    " + line if line != "\n" else line)
+    if empty:
+        f.write(" {}\n")
+
+
+def dump(data, f):
+    yaml.dump(data, f, Dumper=YamlDumper, **YAML_DUMP_OPTIONS)
+
+
+def load(f):
+    return yaml.load(f, Loader=YamlLoader)
+
+
+def read_file(filename: str, lazy_details: bool = True):
+    """Load a YAML file; with lazy_details the task descriptions are kept as LazyText."""
+    with open(filename, "r", encoding="utf-8") as f:
+        if not lazy_details:
+            return load(f)
+        text, blocks = _cut_detail_blocks(f.read())
+    loader = _LazyDetailsLoader(text)
+    loader.lazy_blocks = blocks
+    try:
+        return loader.get_single_data()
+    finally:
+        loader.dispose()